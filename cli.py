@@ -1,20 +1,25 @@
 #!/usr/bin/env python3
 import argparse
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+import os
+import re
 import time
-import json
+from dataclasses import dataclass
+from typing import NamedTuple
 from pathlib import Path
 import logging
 from ebooklib import epub
-import ebooklib
-from bs4 import BeautifulSoup
-from tqdm import tqdm
+from lxml import etree
 
 from libs.epub_utils import (
-    normalize_language, load_progress, save_progress,
-    get_html_chunks, inject_translations, hash_key,
-    setup_logging, detect_drm, DRM_NONE
+    normalize_language, load_progress, save_progress, append_progress,
+    get_html_chunks, iter_documents, inject_translations, chunk_key,
+    setup_logging, detect_drm, DRM_NONE, json_dumps, json_loads, parse_html, html_text, chunk_text,
+    has_min_words
 )
-from libs.translation import translate_with_chunking, TranslationError
+from libs.translation import translate_with_chunking, TranslationError, close_session, set_cache_dir
 from libs.notes import convert_translator_notes_to_footnotes
 from libs.prompts import PREDEFINED_PROMPTS
 
@@ -31,70 +36,140 @@ DEFAULT_MODELS = [
 ]
 
 
+@dataclass(frozen=True, slots=True)
+class RunConfig:
+    """Settings resolved once from the command line and shared by both modes."""
+    lang: str
+    lang_code: str
+    prompt: str
+    url: str
+    debug: bool
+    models: tuple[str, ...]
+
+
+class ModelRun(NamedTuple):
+    """Outcome of translating one chapter with one model: plain text of the result and wall time."""
+    content: str
+    elapsed: float
+
+
+# Last sentence terminator of a string (everything after it is terminator-free)
+_SENTENCE_END = re.compile(r'[.!?…][^.!?…]*$')
+
+
 def truncate_text(text: str, word_limit: int = 500) -> str:
-    words = text.strip().split()
-    if len(words) <= word_limit:
-        return " ".join(words)
+    # Stop splitting after word_limit words; anything left over ends up in one last item
+    words = text.split(None, word_limit)
     truncated = " ".join(words[:word_limit])
-    for ending in ['.', '!', '?', '...']:
-        pos = truncated.rfind(ending)
-        if pos > len(truncated) * 0.5:
-            return truncated[:pos+1]
+    if len(words) <= word_limit:
+        return truncated
+    match = _SENTENCE_END.search(truncated)
+    if match and match.start() > len(truncated) * 0.5:
+        return truncated[:match.start()+1]
     return truncated + "..."
 
 
-def extract_plaintext(epub_path: Path, lang: str, chapter_only: int = None, debug: bool = False) -> str:
-    book = epub.read_epub(str(epub_path))
-    texts = []
-    valid = []
-    for idx, item in enumerate(book.get_items_of_type(ebooklib.ITEM_DOCUMENT)):
-        soup = BeautifulSoup(item.get_content(), 'html.parser')
-        txt = soup.get_text(strip=True)
-        if len(txt.split()) >= 200:
-            valid.append((idx, txt))
+@functools.lru_cache(maxsize=4)
+def _read_epub_cached(path: str, mtime_ns: int) -> epub.EpubBook:
+    return epub.read_epub(path)
+
+
+def load_book(epub_file: Path | epub.EpubBook) -> epub.EpubBook:
+    """
+    Return the parsed EPUB for a path (or the book itself), reusing the last parse while the file is unchanged.
+    The returned book is shared: callers must not modify it.
+    """
+    if isinstance(epub_file, epub.EpubBook):
+        return epub_file
+    try:
+        mtime_ns = os.stat(epub_file).st_mtime_ns
+    except OSError:
+        # Let ebooklib report missing or unreadable files
+        return epub.read_epub(str(epub_file))
+    return _read_epub_cached(str(epub_file), mtime_ns)
+
+
+# Every heading in document order, collected in a single walk of the tree
+_HEADING_XPATH = etree.XPath('//h1|//h2|//h3|//h4|//h5|//h6')
+
+
+def _chapter_title(root, txt: str) -> str:
+    # Try to extract title from the highest-level heading (first one wins on ties)
+    headings = _HEADING_XPATH(root) if root is not None else []
+    if headings:
+        heading = min(headings, key=lambda h: h.tag)
+        return ''.join(s.strip() for s in heading.itertext())
+    # Fallback to first line/sentence
+    first_line = next((line.strip() for line in txt.splitlines() if line.strip()), "")
+    if len(first_line) > 100:  # If first line is too long, truncate
+        first_line = first_line[:97] + "..."
+    return first_line
+
+
+def _iter_valid_chapters(book: epub.EpubBook):
+    """Yield (title, text, word_count) for each document with at least 200 words, in reading order."""
+    for item in iter_documents(book):
+        # Parse once for both the text and the title
+        root = parse_html(item.get_content())
+        # Same word-count gate as get_html_chunks, so chapter numbers agree
+        txt = html_text(root)
+        if has_min_words(txt, 200):
+            yield _chapter_title(root, txt), txt, len(txt.split())
+
+
+class _ChapterIndex:
+    """Valid chapters of a book, discovered lazily: asking for chapter k only parses up to it."""
+
+    def __init__(self, book: epub.EpubBook):
+        self._pending = _iter_valid_chapters(book)
+        self.found = []
+
+    def get(self, chapter: int) -> tuple[str, str, int] | None:
+        """(title, text, word_count) of a 1-based chapter, or None if the book has fewer chapters."""
+        if chapter < 1:
+            return None
+        while len(self.found) < chapter:
+            nxt = next(self._pending, None)
+            if nxt is None:
+                return None
+            self.found.append(nxt)
+        return self.found[chapter-1]
+
+    def all(self) -> list[tuple[str, str, int]]:
+        self.found.extend(self._pending)
+        return self.found
+
+
+@functools.lru_cache(maxsize=4)
+def _chapter_index(book: epub.EpubBook) -> _ChapterIndex:
+    return _ChapterIndex(book)
+
+
+# Chapter numbers count every document of at least 200 words, in spine order, on every path
+# (translation, comparison, Gradio), so --chapter N always points at the same document.
+def extract_plaintext(epub_file: Path | epub.EpubBook, lang: str, chapter_only: int = None, debug: bool = False) -> str:
+    """Plain text of one chapter (1-based) or of the whole book. Accepts a path or a loaded book."""
+    index = _chapter_index(load_book(epub_file))
     if chapter_only:
-        if 1 <= chapter_only <= len(valid):
-            return valid[chapter_only-1][1]
-        return ""
-    return " ".join(t for _, t in valid)
+        found = index.get(chapter_only)
+        return found[1] if found else ""
+    return " ".join(txt for _, txt, _ in index.all())
 
 
-def get_chapter_info(epub_path: Path, chapter: int) -> tuple[str, int]:
-    """Get chapter title and word count for logging purposes."""
-    book = epub.read_epub(str(epub_path))
-    valid_chapters = []
-    
-    for idx, item in enumerate(book.get_items_of_type(ebooklib.ITEM_DOCUMENT)):
-        soup = BeautifulSoup(item.get_content(), 'html.parser')
-        txt = soup.get_text(strip=True)
-        if len(txt.split()) >= 200:
-            # Try to extract title from first heading or first line
-            title = ""
-            for tag in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-                heading = soup.find(tag)
-                if heading:
-                    title = heading.get_text(strip=True)
-                    break
-            
-            if not title:
-                # Fallback to first line/sentence
-                first_line = txt.split('\n')[0].strip()
-                if len(first_line) > 100:  # If first line is too long, truncate
-                    first_line = first_line[:97] + "..."
-                title = first_line
-            
-            valid_chapters.append((title, len(txt.split())))
-    
-    if 1 <= chapter <= len(valid_chapters):
-        return valid_chapters[chapter-1]
+def get_chapter_info(epub_file: Path | epub.EpubBook, chapter: int) -> tuple[str, int]:
+    """Get chapter title and word count for logging purposes. Accepts a path or a loaded book."""
+    found = _chapter_index(load_book(epub_file)).get(chapter)
+    if found:
+        title, _, word_count = found
+        return title, word_count
     else:
         return f"Chapter {chapter}", 0
 
 
-def run_model_translation(model_name: str, chapter: int, lang: str, epub_file: Path,
-                          prompt: str, url: str, debug: bool = False) -> tuple[str, float]:
+def run_model_translation(model_name: str, chapter: int, lang: str, epub_file: Path | epub.EpubBook,
+                          prompt: str, url: str, debug: bool = False) -> ModelRun:
     start = time.time()
-    book = epub.read_epub(str(epub_file))
+    book = load_book(epub_file)
     chunks = get_html_chunks(book, chapter_only=chapter)
     if not chunks:
         raise ValueError(f"Chapter {chapter} not found")
@@ -108,13 +183,54 @@ def run_model_translation(model_name: str, chapter: int, lang: str, epub_file: P
                                                debug=debug, chapter_info=chapter_info)
     translated_html, notes = convert_translator_notes_to_footnotes(translated_html)
     full_html = translated_html + ''.join(notes)
-    plain = BeautifulSoup(full_html, 'html.parser').get_text(strip=True)
-    elapsed = time.time() - start
-    return plain, elapsed
+    plain = html_text(full_html).strip()
+    return ModelRun(plain, time.time() - start)
+
+
+async def run_model_translation_async(model_name: str, chapter: int, lang: str, epub_file: Path | epub.EpubBook,
+                                      prompt: str, url: str, debug: bool = False,
+                                      executor: ThreadPoolExecutor = None) -> ModelRun:
+    """Async variant of run_model_translation, run in `executor` (default: the loop's pool)."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(
+        run_model_translation, model_name, chapter, lang, epub_file, prompt, url, debug=debug
+    ))
+
+
+async def compare_models(models: list[str], chapter: int, lang: str, epub_file: Path | epub.EpubBook,
+                         prompt: str, url: str, debug: bool = False) -> dict:
+    """
+    Translate the same chapter with every model concurrently.
+    Returns {model: {'content', 'time', 'success'}} in the order of `models`.
+    """
+    logger = logging.getLogger(__name__)
+    for model in models:
+        logger.info("[Chapter %d] 🤖 Translating with model %s...", chapter, model)
+
+    # One thread per model: the default pool is sized on CPU count and would queue some models
+    with ThreadPoolExecutor(max_workers=max(1, len(models))) as pool:
+        results = await asyncio.gather(
+            *(run_model_translation_async(model, chapter, lang, epub_file, prompt, url,
+                                          debug=debug, executor=pool)
+              for model in models),
+            return_exceptions=True
+        )
+
+    outputs = {}
+    for model, result in zip(models, results):
+        if isinstance(result, Exception):
+            outputs[model] = {'content': '', 'time': 0, 'success': False}
+            logger.error("Model %s failed: %s", model, result)
+        else:
+            content, elapsed = result
+            outputs[model] = {'content': content, 'time': elapsed, 'success': True}
+            logger.info("%s done in %.1fs", model, elapsed)
+    return outputs
 
 
 def translate_with_fallback(models: list[str], prompt: str, url: str, html: str, 
-                           progress: dict, debug: bool = False, chapter_info: str = None) -> tuple[str, str]:
+                           progress: dict, debug: bool = False, chapter_info: str = None,
+                           concurrency: int = 1, parallel_models: int = 1) -> tuple[str, str]:
     """
     Translate using multiple models with intelligent chunking and fallback.
     Returns (translated_html, successful_model_name)
@@ -124,7 +240,9 @@ def translate_with_fallback(models: list[str], prompt: str, url: str, html: str,
     try:
         logger.info("Starting translation with models: %s", ", ".join(models))
         translated, successful_model = translate_with_chunking(url, models, prompt, html, progress, 
-                                                             debug=debug, chapter_info=chapter_info)
+                                                             debug=debug, chapter_info=chapter_info,
+                                                             concurrency=concurrency,
+                                                             parallel_models=parallel_models)
         logger.info("✅ Translation successful with model: %s", successful_model)
         return translated, successful_model
         
@@ -133,67 +251,179 @@ def translate_with_fallback(models: list[str], prompt: str, url: str, html: str,
         raise e
 
 
+async def translate_chunks(chunks: list[tuple], models: list[str], prompt: str, url: str,
+                           progress: dict, workspace: Path, jobs: int = 1, debug: bool = False,
+                           chapter: int = None, epub_file: Path | epub.EpubBook = None,
+                           compact_every: int = 64, chunk_jobs: int = 1,
+                           parallel_models: int = 1) -> list[str]:
+    """
+    Translate every chunk not yet in progress['translated'], keeping up to `jobs` chapters in flight
+    (and up to `chunk_jobs` requests per chapter when a chapter has to be split, or
+    `parallel_models` models racing on its full translation).
+    Results are keyed by chunk hash, so completion order does not matter for injection.
+    Each translation is appended to the progress journal as it completes; the full progress
+    file is rewritten every `compact_every` completions and once more at the end.
+    Returns the progress key of each chunk, for inject_translations.
+    """
+    # Only the translate path shows a progress bar; keep tqdm out of --help and --compare startup
+    from tqdm import tqdm
+
+    logger = logging.getLogger(__name__)
+    trans_map = progress.setdefault('translated', {})
+    # Raw-bytes hash -> progress key, so resumed runs skip the HTML parse of known chunks
+    raw_to_key = progress.setdefault('raw_to_key', {})
+    total_chapters = 1 if chapter else len(chunks)
+
+    debug_data = {}
+    debug_path = Path('.debug.translate.json')
+    if debug and debug_path.exists():
+        debug_data = json_loads(debug_path.read_bytes())
+
+    semaphore = asyncio.Semaphore(max(1, jobs))
+    failed = asyncio.Event()
+    uncompacted = 0
+    bar = tqdm(total=len(chunks), desc="Translating")
+
+    def compact():
+        nonlocal uncompacted
+        # Worker threads may still update chunk-size hints in progress, so serialize a snapshot
+        save_progress(workspace, dict(progress))
+        if debug:
+            debug_tmp = debug_path.with_suffix('.tmp')
+            debug_tmp.write_bytes(json_dumps(debug_data, indent=True))
+            os.replace(debug_tmp, debug_path)
+        uncompacted = 0
+
+    async def translate_chunk(chunk_idx: int, raw: bytes, key: str):
+        nonlocal uncompacted
+        async with semaphore:
+            # Stop scheduling new chapters once one has failed with every model
+            if failed.is_set():
+                return
+            if chapter:
+                chapter_info = f"Chapter {chapter}"
+            else:
+                chapter_info = f"Chapter {chunk_idx + 1}/{total_chapters}"
+                if debug:
+                    chapter_title, _ = get_chapter_info(epub_file, chunk_idx + 1)
+                    logger.info("📖 Processing chapter %d/%d: '%s'", 
+                               chunk_idx + 1, total_chapters, chapter_title)
+            try:
+                # Use fallback system with multiple models
+                translated, successful_model = await asyncio.to_thread(
+                    translate_with_fallback, models, prompt, url, raw.decode('utf-8'), progress,
+                    debug=debug, chapter_info=chapter_info, concurrency=chunk_jobs,
+                    parallel_models=parallel_models
+                )
+            except TranslationError as e:
+                logger.error("Translation error with all models: %s", e)
+                failed.set()
+                return
+
+        logger.info("✅ Chunk translated successfully with model: %s", successful_model)
+        if debug:
+            debug_data[chunk_text(raw)] = translated
+        trans_html, notes = convert_translator_notes_to_footnotes(translated)
+        trans_map[key] = trans_html + ''.join(notes)
+        append_progress(workspace, key, trans_map[key])
+        bar.update()
+        uncompacted += 1
+        if uncompacted >= compact_every:
+            compact()
+
+    tasks = []
+    keys = []
+    scheduled = set()
+    known_raw_keys = len(raw_to_key)
+    for chunk_idx, (item, raw) in enumerate(chunks):
+        key = chunk_key(raw, raw_to_key)
+        keys.append(key)
+        if key in trans_map or key in scheduled:
+            # Already translated, or an identical chunk earlier in the book will provide it
+            bar.update()
+            continue
+        scheduled.add(key)
+        tasks.append(translate_chunk(chunk_idx, raw, key))
+
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        if uncompacted or len(raw_to_key) != known_raw_keys:
+            compact()
+        bar.close()
+    return keys
+
+
 def write_markdown(out_file: Path, original: str, model_data: dict):
     # Calculate word count for speed metrics
     original_word_count = len(original.split())
     
-    with out_file.open('w', encoding='utf-8') as f:
-        f.write("# Model Comparison - Chapter Output\n\n")
-        f.write("## Original (truncated)\n\n")
-        f.write("```\n")
-        f.write(truncate_text(original) + "\n")
-        f.write("```\n\n")
-
-        sorted_md = sorted(model_data.items(), key=lambda x: x[1]['time'])
-        for model, data in sorted_md:
-            status = "✅ Success" if data['success'] else "❌ Failed"
-            if data['success'] and data['time'] > 0:
-                words_per_min = (original_word_count * 60) / data['time']
-                f.write(f"## {model} - {data['time']:.1f}s ({words_per_min:.0f} words/min) ({status})\n\n")
-            else:
-                f.write(f"## {model} - {data['time']:.1f}s ({status})\n\n")
-            
-            if data['success']:
-                f.write("```\n")
-                f.write(truncate_text(data['content']) + "\n")
-                f.write("```\n\n")
-            else:
-                f.write("*Translation failed*\n\n")
-
-        f.write("## Timing Summary\n\n")
-        f.write("| Model | Time (s) | Words/min | Status |\n")
-        f.write("|-------|-----------|-----------|--------|\n")
-        for model, data in sorted_md:
-            status = "✅ Success" if data['success'] else "❌ Failed"
-            if data['success'] and data['time'] > 0:
-                words_per_min = (original_word_count * 60) / data['time']
-                f.write(f"| {model} | {data['time']:.1f} | {words_per_min:.0f} | {status} |\n")
-            else:
-                f.write(f"| {model} | {data['time']:.1f} | N/A | {status} |\n")
+    # Build the whole report in memory, then write it in one go
+    parts = [
+        "# Model Comparison - Chapter Output\n\n",
+        "## Original (truncated)\n\n",
+        "```\n", truncate_text(original), "\n```\n\n",
+    ]
+
+    sorted_md = sorted(model_data.items(), key=lambda x: x[1]['time'])
+    for model, data in sorted_md:
+        status = "✅ Success" if data['success'] else "❌ Failed"
+        if data['success'] and data['time'] > 0:
+            words_per_min = (original_word_count * 60) / data['time']
+            parts.append(f"## {model} - {data['time']:.1f}s ({words_per_min:.0f} words/min) ({status})\n\n")
+        else:
+            parts.append(f"## {model} - {data['time']:.1f}s ({status})\n\n")
+        
+        if data['success']:
+            parts += ["```\n", truncate_text(data['content']), "\n```\n\n"]
+        else:
+            parts.append("*Translation failed*\n\n")
+
+    parts.append("## Timing Summary\n\n")
+    parts.append("| Model | Time (s) | Words/min | Status |\n")
+    parts.append("|-------|-----------|-----------|--------|\n")
+    for model, data in sorted_md:
+        status = "✅ Success" if data['success'] else "❌ Failed"
+        if data['success'] and data['time'] > 0:
+            words_per_min = (original_word_count * 60) / data['time']
+            parts.append(f"| {model} | {data['time']:.1f} | {words_per_min:.0f} | {status} |\n")
+        else:
+            parts.append(f"| {model} | {data['time']:.1f} | N/A | {status} |\n")
+
+    # Atomic replace, so an interrupted run never leaves a half-written report
+    temp = out_file.with_suffix(out_file.suffix + '.tmp')
+    temp.write_text(''.join(parts), encoding='utf-8')
+    os.replace(temp, out_file)
+
+
+def _csv_tuple(value: str) -> tuple[str, ...]:
+    """argparse type for comma-separated model lists: 'a, b,,c' -> ('a', 'b', 'c')."""
+    return tuple(m for m in (part.strip() for part in value.split(',')) if m)
 
 
 def main():
     parser = argparse.ArgumentParser(description="Translate EPUB or compare models on a chapter.")
     parser.add_argument('-f', '--file', required=True, help="Path to EPUB file")
     parser.add_argument('-l', '--lang', required=True, help="Target language")
-    parser.add_argument('-m', '--model', default='mistral:7b,nous-hermes2', 
+    parser.add_argument('-m', '--model', type=_csv_tuple, default='mistral:7b,nous-hermes2',
                        help="Model name(s) for translation - comma-separated list, will fallback in order (e.g., 'dorian2b/vera,mistral-small:24b')")
     parser.add_argument('-p', '--prompt-style', default='literary', help="Prompt style")
     parser.add_argument('-u', '--url', default='http://localhost:11434', help="API base URL")
     parser.add_argument('-w', '--workspace', default='.progress.json', help="Progress file")
-    parser.add_argument('--chapter', type=int, help="Chapter number for translation or comparison")
+    parser.add_argument('--chapter', type=int, help="Chapter number for translation or comparison (documents of at least 200 words, in reading order)")
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                       help="Number of chapters translated concurrently (server must allow it, see OLLAMA_NUM_PARALLEL)")
+    parser.add_argument('--chunk-jobs', type=int, default=1,
+                       help="Number of parts of a split chapter translated concurrently")
+    parser.add_argument('--parallel-models', type=int, default=1,
+                       help="Number of models (in --model order) asked for each chapter at the same time; the first valid answer is kept")
+    parser.add_argument('--cache-dir', help="Directory keeping every successful translation request, reused by later runs")
     parser.add_argument('--pdf', action='store_true', help="Export to PDF")
     parser.add_argument('--debug', action='store_true', help="Enable debug mode")
     parser.add_argument('-o', '--output-file', help="Output EPUB or markdown file")
-    parser.add_argument('--compare', nargs='?', const='', help="Comma-separated models to compare (default all)")
+    parser.add_argument('--compare', nargs='?', type=_csv_tuple, const=(), help="Comma-separated models to compare (default all)")
     args = parser.parse_args()
 
-    # Parse comma-separated model names
-    if isinstance(args.model, str):
-        model_list = [m.strip() for m in args.model.split(',') if m.strip()]
-    else:
-        model_list = args.model
-    
     setup_logging(args.debug)
     logger = logging.getLogger(__name__)
 
@@ -207,109 +437,63 @@ def main():
         return 1
     logger.info("✅ Aucun DRM détecté, traduction autorisée")
 
-    prompt = PREDEFINED_PROMPTS[args.prompt_style].format(target_language=args.lang)
+    if args.compare is not None:
+        models = args.compare or tuple(DEFAULT_MODELS)
+    else:
+        models = args.model
+    config = RunConfig(
+        lang=args.lang,
+        lang_code=normalize_language(args.lang),
+        prompt=PREDEFINED_PROMPTS[args.prompt_style].format(target_language=args.lang),
+        url=args.url,
+        debug=args.debug,
+        models=models,
+    )
+
+    if args.cache_dir:
+        set_cache_dir(args.cache_dir)
 
     if args.compare is not None:
-        if args.compare == '':
-            models = DEFAULT_MODELS
-        else:
-            models = [m.strip() for m in args.compare.split(',') if m.strip()]
         if not args.chapter:
             parser.error("--chapter is required for model comparison.")
         
+        # Parse the book once and share it between all models
+        book = load_book(Path(args.file))
+        
         # Get chapter info for better logging
-        chapter_title, word_count = get_chapter_info(Path(args.file), args.chapter)
+        chapter_title, word_count = get_chapter_info(book, args.chapter)
         
-        outputs = {}
         logger.info("🔍 Starting model comparison for chapter %d: '%s' (%d words)", 
                    args.chapter, chapter_title, word_count)
         
-        for model in models:
-            logger.info("[Chapter %d] 🤖 Translating with model %s...", args.chapter, model)
-            try:
-                content, elapsed = run_model_translation(
-                    model, args.chapter, args.lang, Path(args.file), prompt, args.url, debug=args.debug
-                )
-                outputs[model] = {'content': content, 'time': elapsed, 'success': True}
-                logger.info("%s done in %.1fs", model, elapsed)
-            except Exception as e:
-                outputs[model] = {'content': '', 'time': 0, 'success': False}
-                logger.error("Model %s failed: %s", model, e)
-        original = extract_plaintext(Path(args.file), args.lang, chapter_only=args.chapter, debug=args.debug)
+        outputs = asyncio.run(compare_models(
+            config.models, args.chapter, config.lang, book, config.prompt, config.url, debug=config.debug
+        ))
+        original = extract_plaintext(book, config.lang, chapter_only=args.chapter, debug=config.debug)
         out_md = Path(args.output_file or 'model_comparison.md')
         write_markdown(out_md, original, outputs)
         print(f"✅ Comparison saved to {out_md}")
         return
 
-    lang_code = normalize_language(args.lang)
+    # Not load_book: inject_translations rewrites this book's documents, and the cached one is shared
     book = epub.read_epub(args.file)
     chunks = get_html_chunks(book, args.chapter)
     if not chunks:
         logger.error("No content to translate")
         return
     
-    # Determine chapter context for logging
-    if args.chapter:
-        # Single chapter mode
-        total_chapters = 1
-        chapter_prefix = f"Chapter {args.chapter}"
-    else:
-        # Multi-chapter mode - count total chapters for context
-        all_chunks = get_html_chunks(book, None)
-        total_chapters = len(all_chunks)
-        
     workspace = Path(args.workspace)
     prog = load_progress(workspace)
+    keys = asyncio.run(translate_chunks(
+        chunks, config.models, config.prompt, config.url, prog, workspace,
+        jobs=args.jobs, debug=config.debug, chapter=args.chapter, epub_file=book,
+        chunk_jobs=args.chunk_jobs,
+        parallel_models=args.parallel_models
+    ))
     trans_map = prog.get('translated', {})
 
-    debug_data = {}
-    debug_path = Path('.debug.translate.json')
-    if args.debug and debug_path.exists():
-        debug_data = json.loads(debug_path.read_text(encoding='utf-8'))
-
-    bar = tqdm(total=len(chunks), desc="Translating")
-    for chunk_idx, (item, raw) in enumerate(chunks):
-        text = BeautifulSoup(raw, 'html.parser').get_text().strip()
-        key = hash_key(text)
-        if key in trans_map:
-            bar.update()
-            continue
-        
-        # Create chapter context for this chunk with title information
-        if args.chapter:
-            chapter_info = chapter_prefix
-        else:
-            # Get chapter title for better context in debug mode
-            chapter_title, _ = get_chapter_info(Path(args.file), chunk_idx + 1)
-            chapter_info = f"Chapter {chunk_idx + 1}/{total_chapters}"
-            
-            if args.debug:
-                logger.info("📖 Processing chapter %d/%d: '%s'", 
-                           chunk_idx + 1, total_chapters, chapter_title)
-            
-        try:
-            # Use fallback system with multiple models
-            translated, successful_model = translate_with_fallback(
-                model_list, prompt, args.url, raw.decode('utf-8'), prog, 
-                debug=args.debug, chapter_info=chapter_info
-            )
-            logger.info("✅ Chunk translated successfully with model: %s", successful_model)
-            
-            if args.debug:
-                debug_data[text] = translated
-                debug_path.write_text(json.dumps(debug_data, indent=2, ensure_ascii=False), encoding='utf-8')
-        except TranslationError as e:
-            logger.error("Translation error with all models: %s", e)
-            break
-        trans_html, notes = convert_translator_notes_to_footnotes(translated)
-        trans_map[key] = trans_html + ''.join(notes)
-        prog['translated'] = trans_map
-        save_progress(workspace, prog)
-        bar.update()
-    bar.close()
-
-    injected = inject_translations(chunks, trans_map)
-    out_epub = Path(args.output_file or f"{Path(args.file).stem}.{lang_code}.epub")
+    injected = inject_translations(chunks, trans_map, keys=keys)
+    out_epub = Path(args.output_file or f"{Path(args.file).stem}.{config.lang_code}.epub")
     epub.write_epub(str(out_epub), book)
     logger.info("Saved translated EPUB: %s", out_epub)
     if args.pdf:
@@ -317,4 +501,7 @@ def main():
         generate_pdf(out_epub)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    try:
+        main()
+    finally:
+        close_session()
\ No newline at end of file
@@ -1,29 +1,69 @@
 import gradio as gr
+import functools
 import tempfile
 import json
+import sqlite3
+import threading
+import time
 from pathlib import Path
 from ebooklib import epub
-from bs4 import BeautifulSoup
 
-from libs.epub_utils import get_html_chunks, normalize_language
+from libs.epub_utils import get_html_chunks, normalize_language, hash_key, stripped_text
 from libs.translation import translate_with_chunking
 from libs.notes import convert_translator_notes_to_footnotes
 
-# Cache preview translations en mémoire
-preview_cache = {}
+class PreviewCache:
+    """
+    Cache des traductions d'aperçu, persisté dans SQLite pour survivre aux redémarrages.
+    Seules les `max_entries` entrées les plus récemment utilisées sont conservées.
+    """
+
+    def __init__(self, path: str = '.preview_cache.sqlite', max_entries: int = 256):
+        self.max_entries = max_entries
+        # Gradio appelle les callbacks depuis plusieurs threads
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('CREATE TABLE IF NOT EXISTS preview (key TEXT PRIMARY KEY, html TEXT, used REAL)')
+
+    def get(self, key: str) -> str | None:
+        with self._lock, self._db:
+            row = self._db.execute('SELECT html FROM preview WHERE key = ?', (key,)).fetchone()
+            if row:
+                self._db.execute('UPDATE preview SET used = ? WHERE key = ?', (time.time(), key))
+        return row[0] if row else None
+
+    def put(self, key: str, html: str) -> None:
+        with self._lock, self._db:
+            self._db.execute('INSERT OR REPLACE INTO preview VALUES (?, ?, ?)', (key, html, time.time()))
+            self._db.execute(
+                'DELETE FROM preview WHERE key NOT IN (SELECT key FROM preview ORDER BY used DESC LIMIT ?)',
+                (self.max_entries,)
+            )
+
+
+# Cache des traductions d'aperçu, indexé par contenu du chapitre et paramètres de traduction
+preview_cache = PreviewCache()
 
 def list_chapters(epub_file):
     """
     Retourne une liste de tuples (numéro_chapitre, nombre_de_mots) pour chaque chapitre valable.
     """
-    book = epub.read_epub(epub_file.name)
+    path = Path(epub_file.name)
+    stat = path.stat()
+    # Copie : le résultat en cache ne doit pas être modifié par l'appelant
+    return list(_list_chapters_cached(str(path), stat.st_mtime_ns, stat.st_size))
+
+
+@functools.lru_cache(maxsize=16)
+def _list_chapters_cached(path, mtime_ns, size):
+    """Parse le livre une seule fois par fichier ; mtime et taille invalident l'entrée."""
+    book = epub.read_epub(path)
     chapters = []
     for idx, item in enumerate(book.get_items_of_type(epub.ITEM_DOCUMENT)):
-        soup = BeautifulSoup(item.get_content(), 'html.parser')
-        text = soup.get_text(strip=True)
+        text = stripped_text(item.get_content())
         word_count = len(text.split())
         chapters.append((idx+1, word_count))
-    return chapters
+    return tuple(chapters)
 
 def preview_translation(epub_file, lang, prompt_style, model, url, chapter_number):
     """
@@ -37,16 +77,16 @@ def preview_translation(epub_file, lang, prompt_style, model, url, chapter_numbe
     item, raw_html = chunks[0]
     source_html = raw_html.decode('utf-8')
 
-    key = f"{epub_file.name}-{chapter_number}-{lang}"
-    if key in preview_cache:
-        translated_html = preview_cache[key]
-    else:
-        translated = translate_with_chunking(
+    # Le contenu plutôt que le nom du fichier : survit aux renommages, et change avec le modèle ou le style
+    key = hash_key("|".join([source_html, lang, model, prompt_style]))
+    translated_html = preview_cache.get(key)
+    if translated_html is None:
+        translated, _ = translate_with_chunking(
             url, model, prompt_style, source_html, {}
         )
         translated, notes = convert_translator_notes_to_footnotes(translated)
         translated_html = translated + "".join(notes)
-        preview_cache[key] = translated_html
+        preview_cache.put(key, translated_html)
 
     return source_html, translated_html
 
@@ -1,15 +1,24 @@
 import logging
+import os
 from pathlib import Path
 import json
 import hashlib
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
 import zipfile
-import xml.etree.ElementTree as ET
 import re
 from ebooklib import epub
 import ebooklib
-from bs4 import BeautifulSoup
+from lxml import etree
 import logging
 
+try:
+    import orjson
+except ImportError:  # optional: faster (de)serialization of progress and debug files
+    orjson = None
+
 def setup_logging(debug: bool = False) -> None:
     """Configure the root logger."""
     level = logging.DEBUG if debug else logging.INFO
@@ -32,9 +41,15 @@ DRM_BN = "Barnes & Noble"
 DRM_FAIRPLAY = "Apple FairPlay"
 
 
+_RE_BN = re.compile(rb"<encryptedKey>.{78}</encryptedKey>", re.S)
+_RE_ADOBE = re.compile(rb"<encryptedKey>.{186}</encryptedKey>", re.S)
+_RE_ALGO = re.compile(rb"<(?:\w+:)?EncryptionMethod\b[^>]*?\bAlgorithm\s*=\s*([\"'])(.*?)\1", re.S)
+
+
 def detect_drm(epub_path: str) -> str:
     """Retourne une chaîne décrivant le DRM détecté (ou DRM_NONE)."""
     with zipfile.ZipFile(epub_path) as z:
+        # Un seul parcours de namelist() pour tous les tests d'appartenance
         names = set(z.namelist())
 
         # 1. LCP
@@ -45,19 +60,19 @@ def detect_drm(epub_path: str) -> str:
         if "META-INF/rights.xml" in names:
             rights = z.read("META-INF/rights.xml")
             # Heuristique B&N : clé chiffrée de 78 octets
-            if re.search(rb"<encryptedKey>.{78}</encryptedKey>", rights, re.S):
+            if _RE_BN.search(rights):
                 return DRM_BN
             # Heuristique Adobe : clé de 186 octets
-            if re.search(rb"<encryptedKey>.{186}</encryptedKey>", rights, re.S):
+            if _RE_ADOBE.search(rights):
                 return DRM_ADOBE
 
         if "META-INF/encryption.xml" in names:
-            enc_root = ET.fromstring(z.read("META-INF/encryption.xml"))
-            algos = [m.get("Algorithm", "") for m in enc_root.iter("{http://www.w3.org/2001/04/xmlenc#}EncryptionMethod")]
-            algo_str = "|".join(algos).lower()
-            if "adept" in algo_str or "adobe" in algo_str:
+            # Seuls les attributs Algorithm comptent : pas besoin de construire l'arbre
+            algos = {m.group(2).decode("utf-8", "replace").lower()
+                     for m in _RE_ALGO.finditer(z.read("META-INF/encryption.xml"))}
+            if any("adept" in algo or "adobe" in algo for algo in algos):
                 return DRM_ADOBE
-            if "fairplay" in algo_str:
+            if any("fairplay" in algo for algo in algos):
                 return DRM_FAIRPLAY
             # Chiffrement sans droits.xml : peut être un DRM exotique ou de simples polices
             return DRM_UNKNOWN
@@ -69,21 +84,23 @@ def detect_drm(epub_path: str) -> str:
     return DRM_NONE
 
 
-
 logger = logging.getLogger(__name__)
 
+LANGUAGES = {
+    "french": "fr",
+    "english": "en",
+    "german": "de",
+    "spanish": "es",
+    "italian": "it",
+    "portuguese": "pt",
+    "japanese": "ja",
+    "chinese": "zh"
+}
+
+
+@functools.lru_cache(maxsize=64)
 def normalize_language(lang_input: str) -> str:
     """Retourne le code ISO 2 lettres pour la langue demandée."""
-    LANGUAGES = {
-        "french": "fr",
-        "english": "en",
-        "german": "de",
-        "spanish": "es",
-        "italian": "it",
-        "portuguese": "pt",
-        "japanese": "ja",
-        "chinese": "zh"
-    }
     key = lang_input.strip().lower()
     return LANGUAGES.get(key, key)
 
@@ -93,50 +110,247 @@ def hash_key(text: str) -> str:
     return hashlib.sha256(text.encode('utf-8')).hexdigest()
 
 
+def raw_key(raw: bytes) -> str:
+    """Hash of a chunk's raw bytes, used to find its hash_key without parsing the HTML."""
+    return hashlib.sha256(raw).hexdigest()
+
+
+def json_dumps(obj, indent: bool = False) -> bytes:
+    """UTF-8 JSON (non-ASCII kept as is), using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False).encode('utf-8')
+
+
+def json_loads(data: bytes | str):
+    """Parse JSON produced by json_dumps (or any JSON text). Raises json.JSONDecodeError on bad input."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _journal_path(path: Path) -> Path:
+    """Append-only log holding translations saved since the last full save_progress."""
+    return path.with_suffix('.jsonl')
+
+
 def load_progress(path: Path) -> dict:
+    progress = {}
     if path.exists():
-        return json.loads(path.read_text(encoding='utf-8'))
-    return {}
+        progress = json_loads(path.read_bytes())
+    journal = _journal_path(path)
+    if journal.exists():
+        translated = progress.setdefault('translated', {})
+        with journal.open('rb') as f:
+            for line in f:
+                try:
+                    entry = json_loads(line)
+                except json.JSONDecodeError:
+                    # Last line may be truncated if the process was killed mid-write
+                    logger.warning("Ignoring corrupted line in %s", journal)
+                    continue
+                translated[entry['key']] = entry['html']
+    return progress
+
+
+def append_progress(path: Path, key: str, html: str) -> None:
+    """Record one translated chunk without rewriting the whole progress file."""
+    with _journal_path(path).open('ab') as f:
+        f.write(json_dumps({'key': key, 'html': html}) + b'\n')
+        # A translation can take minutes to produce: make sure it survives a crash or power loss
+        f.flush()
+        os.fsync(f.fileno())
 
 
 def save_progress(path: Path, progress: dict) -> None:
+    """Write the full progress atomically; this also compacts the append-only journal."""
     temp = path.with_suffix('.tmp')
-    temp.write_text(json.dumps(progress, indent=2, ensure_ascii=False), encoding='utf-8')
-    temp.replace(path)
+    with temp.open('wb') as f:
+        f.write(json_dumps(progress, indent=True))
+        # Data must be on disk before the rename, or a crash could leave an empty progress file
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
+    _journal_path(path).unlink(missing_ok=True)
+
+
+# Readable text only: script, style and template contents and the <head> title are not words of the page
+_TEXT_XPATH = etree.XPath('//text()[not(parent::script or parent::style or parent::template or parent::title)]')
+# One parser per thread: lxml serializes parses sharing a parser object
+_PARSERS = threading.local()
+
+
+def _html_parser() -> etree.HTMLParser:
+    parser = getattr(_PARSERS, 'parser', None)
+    if parser is None:
+        # EPUB documents are UTF-8; without this lxml falls back to latin-1 for undeclared bytes
+        parser = _PARSERS.parser = etree.HTMLParser(encoding='utf-8')
+    return parser
+
+
+def parse_html(raw: bytes | str):
+    """Parse an HTML document with lxml; returns the root element, or None for empty input."""
+    if isinstance(raw, str):
+        raw = raw.encode('utf-8')
+    return etree.fromstring(raw, _html_parser()) if raw.strip() else None
 
 
-def get_html_chunks(book: epub.EpubBook, chapter_only=None, min_words: int = 200):
+def html_text(raw) -> str:
     """
-    Extract valid document items from EPUB and return list of (item, raw_html_bytes).
+    Plain text of an HTML document (raw bytes/str, or a root from parse_html), extracted with lxml.
+    Much cheaper than a BeautifulSoup parse when only the words are needed (counts, previews).
+    """
+    root = raw if isinstance(raw, etree._Element) else parse_html(raw)
+    return ''.join(_TEXT_XPATH(root)) if root is not None else ""
+
+
+_WORD_RE = re.compile(r'\S+')
+
+
+def has_min_words(text: str, min_words: int) -> bool:
+    """True if text has at least min_words words; stops counting as soon as the threshold is reached."""
+    if min_words <= 0:
+        return True
+    for count, _ in enumerate(_WORD_RE.finditer(text), 1):
+        if count >= min_words:
+            return True
+    return False
+
+
+# Cover, table of contents and title pages: skipped without parsing when a caller only wants chapter text
+_NON_CONTENT_RE = re.compile(r'(?:^|/)(?:cover|nav|toc|titlepage)[-_]?\d*\.x?html?$', re.IGNORECASE)
+
+
+def _spine_id(entry) -> str | None:
+    # Spine entries are (idref, linear) once read from disk, but ids or items while building a book
+    if isinstance(entry, tuple):
+        return entry[0]
+    if isinstance(entry, str):
+        return entry
+    return getattr(entry, 'id', None)
+
+
+def iter_documents(book: epub.EpubBook, skip_non_content: bool = False):
+    """
+    Document items in reading (spine) order, followed by any document missing from the spine.
+    With skip_non_content, cover, navigation and title pages (recognized by file name) are left out.
+    """
+    documents = list(book.get_items_of_type(ebooklib.ITEM_DOCUMENT))
+    spine = book.spine if isinstance(book.spine, (list, tuple)) else []
+    order = {}
+    for position, entry in enumerate(spine):
+        order.setdefault(_spine_id(entry), position)
+    # sorted() is stable: documents outside the spine keep their manifest order, at the end
+    documents.sort(key=lambda item: order.get(item.get_id(), len(order)))
+    for item in documents:
+        if not (skip_non_content and _NON_CONTENT_RE.search(item.file_name or '')):
+            yield item
+
+
+def get_html_chunks(book: epub.EpubBook, chapter_only=None, min_words: int = 200,
+                    skip_non_content: bool = False):
+    """
+    Extract valid document items from EPUB, in reading order, and return list of (item, raw_html_bytes).
+    With chapter_only, stop at that (1-based) valid chapter instead of scanning the whole book;
+    otherwise documents are checked concurrently (lxml releases the GIL while parsing).
+    skip_non_content leaves out cover/toc/title pages (see iter_documents); the translate path keeps
+    them, so every document long enough is translated.
     """
-    valid = []
-    for idx, item in enumerate(book.get_items_of_type(ebooklib.ITEM_DOCUMENT)):
-        soup = BeautifulSoup(item.get_content(), 'html.parser')
-        text = soup.get_text(strip=True)
-        if len(text.split()) >= min_words:
-            valid.append((idx, item, item.get_content()))
     if chapter_only:
-        if 1 <= chapter_only <= len(valid):
-            idx, item, raw = valid[chapter_only-1]
-            return [(item, raw)]
+        count = 0
+        for item in iter_documents(book, skip_non_content):
+            raw = item.get_content()
+            if _is_chapter(raw, min_words):
+                count += 1
+                if count == chapter_only:
+                    return [(item, raw)]
         return []
-    return [(item, raw) for _, item, raw in valid]
+
+    docs = [(item, item.get_content()) for item in iter_documents(book, skip_non_content)]
+    workers = min(len(docs), os.cpu_count() or 1)
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            keep = list(executor.map(_is_chapter, [raw for _, raw in docs], repeat(min_words)))
+    else:
+        keep = [_is_chapter(raw, min_words) for _, raw in docs]
+    return [doc for doc, ok in zip(docs, keep) if ok]
+
+
+def _is_chapter(raw: bytes, min_words: int) -> bool:
+    return has_min_words(html_text(raw), min_words)
+
+
+# Same strings as BeautifulSoup's get_text(): script, style and template contents are not text
+_CHUNK_TEXT_XPATH = etree.XPath('//text()[not(parent::script or parent::style or parent::template)]')
+
+
+# BeautifulSoup replaces strings made only of these characters with '\n' or ' ', except in <pre>/<textarea>
+_ASCII_SPACES = ' \n\t\f\r'
+_PRESERVE_WHITESPACE_TAGS = frozenset(('pre', 'textarea'))
+
+
+def _soup_string(text) -> str:
+    """A text node of the lxml tree as BeautifulSoup stores it (whitespace-only strings collapsed)."""
+    if text.strip(_ASCII_SPACES):
+        return text
+    # A tail belongs to the element preceding it; its parent is that element's parent
+    element = text.getparent()
+    if text.is_tail:
+        element = element.getparent()
+    while element is not None:
+        if element.tag in _PRESERVE_WHITESPACE_TAGS:
+            return text
+        element = element.getparent()
+    return '\n' if '\n' in text else ' '
+
+
+def chunk_text(raw_html: bytes | str) -> str:
+    """Text content of a document, as hashed for progress keys: BeautifulSoup's get_text().strip()."""
+    root = parse_html(raw_html)
+    return ''.join(map(_soup_string, _CHUNK_TEXT_XPATH(root))).strip() if root is not None else ""
+
+
+def stripped_text(raw_html: bytes | str) -> str:
+    """Text of a document with each string stripped, like BeautifulSoup's get_text(strip=True)."""
+    root = parse_html(raw_html)
+    return ''.join(text.strip() for text in _CHUNK_TEXT_XPATH(root)) if root is not None else ""
+
+
+def chunk_key(raw_html: bytes, raw_to_key: dict[str, str] = None) -> str:
+    """
+    Progress key of a chunk: hash_key of its text.
+    With `raw_to_key` (raw_key -> progress key, kept in the progress file), chunks seen before
+    are resolved from a hash of their bytes without parsing the HTML; new ones are added to it.
+    """
+    if raw_to_key is None:
+        return hash_key(chunk_text(raw_html))
+    pre_key = raw_key(raw_html)
+    key = raw_to_key.get(pre_key)
+    if key is None:
+        key = raw_to_key[pre_key] = hash_key(chunk_text(raw_html))
+    return key
+
+
+_XHTML_PREFIX = b"<?xml version='1.0' encoding='utf-8'?><!DOCTYPE html><html><head></head><body>"
+_XHTML_SUFFIX = b"</body></html>"
 
 
-def inject_translations(chunks: list[tuple], translations: dict[str, str]) -> int:
+def inject_translations(chunks: list[tuple], translations: dict[str, str], keys: list[str] = None,
+                        raw_to_key: dict[str, str] = None) -> int:
     """
     Inject translated HTML back into EPUB items. Return count injected.
+    `keys` may hold the already computed progress key of each chunk, to skip re-parsing them;
+    otherwise keys are resolved with chunk_key, using `raw_to_key` when given.
     """
     count = 0
-    for item, raw_html in chunks:
-        text = BeautifulSoup(raw_html, 'html.parser').get_text().strip()
-        key = hash_key(text)
+    for idx, (item, raw_html) in enumerate(chunks):
+        key = keys[idx] if keys is not None else chunk_key(raw_html, raw_to_key)
         if key in translations:
-            translated = translations[key]
+            translated = translations[key].encode('utf-8')
             # Check if translation already contains complete HTML structure
-            if not (translated.lower().startswith('<?xml') or translated.lower().startswith('<html')):
-                translated = f"<?xml version='1.0' encoding='utf-8'?><!DOCTYPE html><html><head></head><body>{translated}</body></html>"
-            item.set_content(translated.encode('utf-8'))
+            if not translated[:5].lower().startswith((b'<?xml', b'<html')):
+                translated = _XHTML_PREFIX + translated + _XHTML_SUFFIX
+            item.set_content(translated)
             count += 1
     logger.info("Injected %d translations", count)
     return count
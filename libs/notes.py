@@ -1,19 +1,20 @@
 import re
 
+_NOTE_RE = re.compile(r"\[Translator's note:\s*(.*?)\]")
+
+
 def convert_translator_notes_to_footnotes(html: str, start: int = 1) -> tuple[str, list[str]]:
     notes = []
-    counter = start
-
-    def repl(match: re.Match) -> str:
-        nonlocal counter
+    parts = []
+    pos = 0
+    for counter, match in enumerate(_NOTE_RE.finditer(html), start):
         content = match.group(1).strip()
         ref = f"note{counter}"
-        sup = f'<sup><a href="#ref{ref}" id="ref{ref}">{counter}</a></sup>'
-        note_html = f'<p id="{ref}"><sup><a href="#ref{ref}">{counter}</a></sup> {content}</p>'
-        notes.append(note_html)
-        counter += 1
-        return sup
-
-    processed = re.sub(r"\[Translator's note:\s*(.*?)\]", repl, html)
-    return processed, notes
-
+        parts.append(html[pos:match.start()])
+        parts.append(f'<sup><a href="#ref{ref}" id="ref{ref}">{counter}</a></sup>')
+        notes.append(f'<p id="{ref}"><sup><a href="#ref{ref}">{counter}</a></sup> {content}</p>')
+        pos = match.end()
+    if not notes:
+        return html, notes
+    parts.append(html[pos:])
+    return ''.join(parts), notes
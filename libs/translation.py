@@ -1,20 +1,101 @@
 import requests
-from bs4 import BeautifulSoup
 import logging
-import json
+import os
+import socket
 import time
 from pathlib import Path
 from datetime import datetime
 import re
-from .epub_utils import hash_key
+import threading
+import functools
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .epub_utils import hash_key, json_dumps, json_loads, stripped_text
 from .notes import convert_translator_notes_to_footnotes
 
 logger = logging.getLogger(__name__)
 
+# Shared HTTP session: keep-alive connections are reused across chunks, chapters and models.
+# The pool is sized for concurrent chapters/chunks (--jobs, --chunk-jobs); retries are left to the caller.
+_SESSION = requests.Session()
+_ADAPTER = requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=32, max_retries=0)
+_SESSION.mount('http://', _ADAPTER)
+_SESSION.mount('https://', _ADAPTER)
+
+_DEBUG_LASTCALL = 'debug-lastcall.json'
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+# Single writer: debug dumps are written in request order, off the translation threads
+_DEBUG_WRITER = ThreadPoolExecutor(max_workers=1, thread_name_prefix='debug-lastcall')
+
+
+# Successful translations of this process, keyed by model, prompt and block (LRU, bounded):
+# blocks repeated across chapters or chunking passes are answered without a request
+_TRANSLATION_CACHE: OrderedDict[str, str] = OrderedDict()
+_TRANSLATION_CACHE_SIZE = 256
+_TRANSLATION_CACHE_LOCK = threading.Lock()
+
+
+# Optional on-disk copy of the cache (one <key>.html file per translation), shared across runs
+_CACHE_DIR: Path | None = None
+
+
+def clear_translation_cache() -> None:
+    """Forget the translations memoized by _translate_once (the on-disk cache is kept)."""
+    with _TRANSLATION_CACHE_LOCK:
+        _TRANSLATION_CACHE.clear()
+
+
+def set_cache_dir(cache_dir: str | Path | None) -> None:
+    """Persist successful translations under `cache_dir` and reuse them in later runs (None disables)."""
+    global _CACHE_DIR
+    _CACHE_DIR = Path(cache_dir) if cache_dir else None
+    if _CACHE_DIR:
+        _CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+
+def _remember_translation(cache_key: str, content: str) -> None:
+    with _TRANSLATION_CACHE_LOCK:
+        _TRANSLATION_CACHE[cache_key] = content
+        if len(_TRANSLATION_CACHE) > _TRANSLATION_CACHE_SIZE:
+            _TRANSLATION_CACHE.popitem(last=False)
+
+
+def _read_cached_translation(cache_dir: Path, cache_key: str, block: str) -> str | None:
+    """Translation stored on disk for this key, if any and still valid for `block`."""
+    try:
+        content = (cache_dir / f'{cache_key}.html').read_text(encoding='utf-8')
+    except OSError:
+        return None
+    valid, _, cleaned_content = validate_translation(block, content)
+    return cleaned_content if valid else None
+
+
+def _write_cached_translation(cache_dir: Path, cache_key: str, content: str) -> None:
+    """Atomically store a translation on disk; a failed write only costs a later request."""
+    path = cache_dir / f'{cache_key}.html'
+    tmp = path.with_name(f'{path.name}.{threading.get_ident()}.tmp')
+    try:
+        tmp.write_text(content, encoding='utf-8')
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("Failed to write cached translation %s: %s", path, e)
+
+
+def close_session() -> None:
+    """Close the pooled connections of the shared session (call once all translations are done)."""
+    wait_debug_writes()
+    _SESSION.close()
+
+
 class TranslationError(Exception):
     pass
 
 
+_BODY_OPEN_RE = re.compile(r'<body[^>]*>', re.IGNORECASE)
+_BODY_CLOSE_RE = re.compile(r'</body>', re.IGNORECASE)
+
+
 def extract_html_structure(html: str) -> tuple[str, str, str]:
     """
     Extract HTML structure parts: (prefix, body_content, suffix).
@@ -31,15 +112,14 @@ def extract_html_structure(html: str) -> tuple[str, str, str]:
         - body_content: Just the content inside <body> tags
         - suffix: Everything after body content (closing </body>, </html> tags)
     """
-    # Pattern to match everything up to and including <body> tag
-    body_pattern = r'^(.*?<body[^>]*>)(.*?)(<\/body>.*?)$'
-    
-    match = re.search(body_pattern, html, re.DOTALL | re.IGNORECASE)
-    
-    if match:
-        prefix = match.group(1)  # Everything up to and including <body>
-        body_content = match.group(2)  # Content inside <body> tags
-        suffix = match.group(3)  # </body> and everything after
+    # First <body> tag, then the first </body> after it: two scans, no backtracking over the body
+    body_open = _BODY_OPEN_RE.search(html)
+    body_close = _BODY_CLOSE_RE.search(html, body_open.end()) if body_open else None
+    
+    if body_close:
+        prefix = html[:body_open.end()]  # Everything up to and including <body>
+        body_content = html[body_open.end():body_close.start()]  # Content inside <body> tags
+        suffix = html[body_close.start():]  # </body> and everything after
         return prefix, body_content, suffix
     else:
         # If no body tags found, treat entire content as body
@@ -62,6 +142,23 @@ def wrap_html_content(body_content: str, prefix: str, suffix: str) -> str:
     return prefix + body_content + suffix
 
 
+# Cheap pre-check for validate_translation: five word characters left once complete tags are
+# removed, and not part of an entity, are at least five characters of parsed text
+_MARKUP_RE = re.compile(r'''<(?:[^>"']|"[^"]*"|'[^']*')*>''')
+_HIDDEN_TEXT_RE = re.compile(r'<(?:[!?]|script|style|template)', re.IGNORECASE)
+_WORD_RUN_RE = re.compile(r'(?<![&#\w])\w{5}')
+# A <p> element, not <pre>, <param>, <picture>...
+_P_TAG_RE = re.compile(r'<p[\s/>]', re.IGNORECASE)
+
+
+def _surely_has_text(html: str) -> bool:
+    """True if html certainly holds 5+ characters of text; False means "parse to find out"."""
+    if _HIDDEN_TEXT_RE.search(html):
+        return False
+    text = _MARKUP_RE.sub(' ', html)
+    return '<' not in text and _WORD_RUN_RE.search(text) is not None
+
+
 def validate_translation(orig: str, trans: str) -> tuple[bool, str, str]:
     """
     Validate translation and clean up backticks if present.
@@ -105,11 +202,10 @@ def validate_translation(orig: str, trans: str) -> tuple[bool, str, str]:
             if not trans_stripped.startswith(first_tag):
                 return False, f"Output should start with '{first_tag}' but starts with '{trans_stripped[:50]}...'", trans
     
-    if '<p' in orig and '<p' not in trans_stripped:
+    if _P_TAG_RE.search(orig) and not _P_TAG_RE.search(trans_stripped):
         return False, "Paragraph tags missing", trans
     try:
-        soup = BeautifulSoup(trans_stripped, 'html.parser')
-        if len(soup.get_text(strip=True)) < 5:  # Reduced threshold for testing
+        if not _surely_has_text(trans_stripped) and len(stripped_text(trans_stripped)) < 5:  # Reduced threshold for testing
             return False, "Too little text after parsing", trans
     except Exception as e:
         return False, f"Invalid HTML: {e}", trans
@@ -117,6 +213,10 @@ def validate_translation(orig: str, trans: str) -> tuple[bool, str, str]:
     return True, trans_stripped, trans_stripped
 
 
+_XHTML_PREFIX = '<?xml version="1.0" encoding="utf-8"?><!DOCTYPE html><html><head></head><body>'
+_XHTML_SUFFIX = '</body></html>'
+
+
 def dynamic_chunks(html: str, max_size: int = 10000, max_attempts: int = 10) -> list[str]:
     """
     Split html into 2^n chunks, starting from 2,4,8... until chunk size <= max_size or attempts exhausted.
@@ -127,107 +227,164 @@ def dynamic_chunks(html: str, max_size: int = 10000, max_attempts: int = 10) ->
     
     # If no structure found (simple HTML), create a basic wrapper
     if not prefix and not suffix:
-        prefix = '<?xml version="1.0" encoding="utf-8"?><!DOCTYPE html><html><head></head><body>'
-        suffix = '</body></html>'
+        prefix, suffix = _XHTML_PREFIX, _XHTML_SUFFIX
     
     total = len(body_content)
-    for attempt in range(max_attempts):
-        parts = 2 ** (attempt + 1)
-        chunk_size = total // parts
-        if chunk_size <= max_size:
-            break
-    parts = max(1, 2 ** (attempt + 1))
-    size = total // parts
+    # Smallest power of two (>= 2) with no chunk over max_size (parts >= ceil(total / max_size)),
+    # capped at 2^max_attempts
+    exponent = max(1, min((-(-total // max_size) - 1).bit_length(), max_attempts))
+    parts = 1 << exponent
+    size, remainder = divmod(total, parts)
     
-    # Split only the body content
-    body_chunks = [body_content[i*size:(i+1)*size] for i in range(parts)]
-    # last takes remainder
-    if parts*size < total:
-        body_chunks.append(body_content[parts*size:])
+    # Split only the body content; the first `remainder` chunks take one extra character,
+    # so the remainder is spread out instead of forming a tiny trailing chunk
+    bounds = [i * size + min(i, remainder) for i in range(parts + 1)]
     
     # Wrap each body chunk with the original HTML structure
-    wrapped_chunks = []
-    for body_chunk in body_chunks:
-        full_chunk = wrap_html_content(body_chunk, prefix, suffix)
-        wrapped_chunks.append(full_chunk)
+    wrapped_chunks = [prefix + body_content[start:end] + suffix for start, end in zip(bounds, bounds[1:])]
     
     logger.debug("Dynamic split into %d parts of ~%d chars", len(wrapped_chunks), size)
     return wrapped_chunks
 
 
+# Closing tags of major block elements, preferred split points for smart_html_split
+# (any case: older EPUBs still have upper-case HTML 4 tags)
+_BLOCK_END_RE = re.compile(r'</(?:p|div|section|article|h[1-6])>', re.IGNORECASE)
+_CLOSING_TAG_RE = re.compile(r'</[^>]+>')
+_SPACE_RE = re.compile(r'\s*')
+
+
+@functools.lru_cache(maxsize=16)
+def _block_end_spans(html: str) -> tuple[list[int], list[int]]:
+    """Start and end offsets of every block end tag of html, found in one pass (shared by all split sizes)."""
+    starts, ends = [], []
+    for match in _BLOCK_END_RE.finditer(html):
+        starts.append(match.start())
+        ends.append(match.end())
+    return starts, ends
+
+
 def smart_html_split(html: str, target_size: int = 8000) -> list[str]:
     """
     Split HTML at natural tag boundaries to create chunks of approximately target_size.
     Always splits at HTML tag boundaries - never cuts words or content in half.
+    Works on offsets into html: only the final chunks are copied, and block end tags are
+    located once per html (bisected at each cut, reused when the same html is split again).
     """
     if len(html) <= target_size:
         return [html]
     
-    # Try to split at major block elements (in order of preference)
-    major_tags = ['</p>', '</div>', '</section>', '</article>', '</h1>', '</h2>', '</h3>', '</h4>', '</h5>', '</h6>']
-    
-    chunks = []
-    remaining = html
-    
-    while len(remaining) > target_size:
-        best_split = None
-        best_distance = float('inf')
-        
-        # First, try to find a tag close to target_size (within reasonable range)
-        search_start = max(0, target_size - 1000)  # Look back up to 1000 chars
-        search_end = min(len(remaining), target_size + 1000)  # Look ahead up to 1000 chars
-        
-        for tag in major_tags:
-            tag_pos = remaining.find(tag, search_start, search_end)
-            if tag_pos != -1:
-                tag_end = tag_pos + len(tag)
-                distance = abs(tag_end - target_size)
-                if distance < best_distance:
-                    best_distance = distance
-                    best_split = tag_end
+    min_chunk_size = max(1000, target_size // 4)  # Don't create chunks smaller than 1k or 1/4 target
+    end = len(html.rstrip())
+    starts, ends = _block_end_spans(html)
+    bounds = []
+    start = 0
+    
+    while end - start > target_size:
+        target = start + target_size
+        split = None
+        # First, the block end closest to target_size, looking back and ahead up to 1000 chars:
+        # candidates are the tags within [lo, hi], the closest ones sit on either side of target
+        lo = bisect_left(starts, start + max(0, target_size - 1000))
+        hi = bisect_right(ends, min(end, target + 1000))
+        if lo < hi:
+            after = bisect_left(ends, target, lo, hi)
+            if after == hi or (after > lo and target - ends[after - 1] <= ends[after] - target):
+                after -= 1
+            split = ends[after]
         
-        # If no tag found in preferred range, find the first suitable tag after minimum size
-        if best_split is None:
-            min_chunk_size = max(1000, target_size // 4)  # Don't create chunks smaller than 1k or 1/4 target
-            for tag in major_tags:
-                tag_pos = remaining.find(tag, min_chunk_size)
-                if tag_pos != -1:
-                    best_split = tag_pos + len(tag)
-                    break
+        # If no tag found in preferred range, the first block end after minimum size
+        if split is None:
+            first = bisect_left(starts, start + min_chunk_size)
+            if first < len(ends) and ends[first] <= end:
+                split = ends[first]
         
-        # If still no tag found, find ANY closing tag after minimum size
-        if best_split is None:
-            min_chunk_size = max(1000, target_size // 4)
-            # Look for any closing tag
-            import re
-            tag_pattern = r'</[^>]+>'
-            match = re.search(tag_pattern, remaining[min_chunk_size:])
-            if match:
-                best_split = min_chunk_size + match.end()
-            else:
-                # Last resort: split at target_size but warn
-                logger.warning("No HTML tag found for splitting, forced to cut at position %d", target_size)
-                best_split = target_size
+        # If still no tag found, ANY closing tag after minimum size
+        if split is None:
+            best = _CLOSING_TAG_RE.search(html, start + min_chunk_size, end)
+            if best is not None:
+                split = best.end()
         
-        # Extract chunk and update remaining
-        chunk = remaining[:best_split].strip()
-        if chunk:
-            chunks.append(chunk)
-        remaining = remaining[best_split:].strip()
+        if split is None:
+            # Last resort: split at target_size but warn
+            logger.warning("No HTML tag found for splitting, forced to cut at position %d", target_size)
+            split = target
         
-        # Safety check to prevent infinite loops
-        if len(remaining) == len(html):
-            logger.error("Smart HTML split failed to make progress, falling back to simple split")
-            break
+        bounds.append((start, split))
+        # Skip whitespace between chunks
+        start = _SPACE_RE.match(html, split, end).end()
     
-    # Add remaining content
-    if remaining.strip():
-        chunks.append(remaining)
+    bounds.append((start, end))
+    chunks = [chunk for chunk in (html[s:e].strip() for s, e in bounds) if chunk]
     
     logger.debug("Smart HTML split: %d chars -> %d chunks", len(html), len(chunks))
     return chunks
 
 
+# Comments are matched first so tags inside them are ignored
+_TAG_RE = re.compile(r'<!--.*?-->|<(/?)([a-zA-Z][\w:-]*)[^>]*?(/?)>', re.DOTALL)
+_VOID_TAGS = frozenset(['area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+                        'link', 'meta', 'source', 'track', 'wbr'])
+
+
+def _top_level_blocks(html: str) -> list[str]:
+    """Split body HTML after each top-level element, so every block is balanced on its own."""
+    blocks = []
+    depth = 0
+    start = 0
+    for match in _TAG_RE.finditer(html):
+        closing, name, self_closing = match.groups()
+        if name is None:
+            continue  # comment
+        if closing:
+            depth = max(0, depth - 1)
+        elif not self_closing and name.lower() not in _VOID_TAGS:
+            depth += 1
+            continue
+        if depth == 0:
+            blocks.append(html[start:match.end()])
+            start = match.end()
+    if start < len(html):
+        blocks.append(html[start:])
+    return blocks
+
+
+def pack_html_blocks(html: str, target_size: int = 8000, blocks: list[str] = None) -> list[str]:
+    """
+    Split body HTML into chunks of at most ~target_size made of whole top-level elements,
+    so that no chunk starts or ends in the middle of a paragraph, list or section.
+    Elements larger than target_size on their own are split with smart_html_split, and their
+    pieces packed like blocks: the small tail of a cut element shares a chunk with what follows.
+    `blocks` may hold _top_level_blocks(html), to pack the same html at several sizes with one scan.
+    """
+    if len(html) <= target_size:
+        return [html]
+    
+    chunks = []
+    current = []
+    current_size = 0
+    
+    def flush():
+        nonlocal current, current_size
+        chunk = ''.join(current).strip()
+        if chunk:
+            chunks.append(chunk)
+        current = []
+        current_size = 0
+    
+    for block in blocks if blocks is not None else _top_level_blocks(html):
+        pieces = smart_html_split(block, target_size) if len(block) > target_size else (block,)
+        for piece in pieces:
+            if current_size + len(piece) > target_size:
+                flush()
+            current.append(piece)
+            current_size += len(piece)
+    flush()
+    
+    logger.debug("Packed HTML blocks: %d chars -> %d chunks", len(html), len(chunks))
+    return chunks
+
+
 def smart_html_split_with_structure(html: str, target_size: int = 8000) -> list[str]:
     """
     Split HTML document into chunks, preserving the original HTML structure.
@@ -261,8 +418,138 @@ def smart_html_split_with_structure(html: str, target_size: int = 8000) -> list[
     return structured_chunks
 
 
+def _map_chunks(translate_chunk, chunks: list[str], concurrency: int = 1) -> list[str]:
+    """
+    Translate chunks in order, or with up to `concurrency` requests in flight.
+    Results keep chunk order; the first TranslationError is raised and pending chunks are cancelled.
+    """
+    if concurrency <= 1 or len(chunks) <= 1:
+        return [translate_chunk(i, chunk) for i, chunk in enumerate(chunks)]
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(chunks))) as pool:
+        futures = [pool.submit(translate_chunk, i, chunk) for i, chunk in enumerate(chunks)]
+        try:
+            return [future.result() for future in futures]
+        except TranslationError:
+            for future in futures:
+                future.cancel()
+            raise
+
+
+class _AbortableSession(requests.Session):
+    """
+    Session whose connections can be cut from another thread: abort() makes the requests
+    still waiting on it fail at once, and the server sees the client go away (Ollama then
+    stops generating).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._connections = []
+        self.aborted = False
+        adapter = requests.adapters.HTTPAdapter(max_retries=0)
+        pool_classes = adapter.poolmanager.pool_classes_by_scheme
+        adapter.poolmanager.pool_classes_by_scheme = {
+            scheme: self._tracking_pool(pool_cls) for scheme, pool_cls in pool_classes.items()
+        }
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
+
+    def _tracking_pool(self, pool_cls):
+        session = self
+
+        class TrackingConnection(pool_cls.ConnectionCls):
+            def connect(self):
+                super().connect()
+                # Connected while abort() ran: it may have missed this socket, so close it here.
+                # (connect sets sock then reads aborted, abort sets aborted then reads sock:
+                # one of the two always sees the other.)
+                if session.aborted:
+                    self.close()
+                    raise ConnectionAbortedError("Request aborted")
+
+        class TrackingPool(pool_cls):
+            ConnectionCls = TrackingConnection
+
+            def _new_conn(self):
+                if session.aborted:
+                    raise ConnectionAbortedError("Request aborted")
+                conn = super()._new_conn()
+                session._connections.append(conn)
+                return conn
+        return TrackingPool
+
+    def abort(self) -> None:
+        """Stop every request of this session, including ones still connecting."""
+        self.aborted = True
+        for conn in list(self._connections):
+            sock = getattr(conn, 'sock', None)
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass  # already closed
+
+
+# progress is shared by the chapters translated concurrently (--jobs): updates of the
+# full-failure records are read-modify-write, so they are serialized
+_FULL_FAIL_LOCK = threading.Lock()
+
+
+def _record_full_failure(progress: dict, model: str, size: int) -> None:
+    """
+    Note that a full body of `size` chars failed with `model`, then translated chunked.
+    A single failure may be transient (timeout, flaky validation): the size threshold that
+    skips full requests is only set once a second body has failed, at the larger of the two sizes.
+    """
+    with _FULL_FAIL_LOCK:
+        first_failures = progress.setdefault('full_fail_first', {})
+        first = first_failures.get(model)
+        if first is None:
+            first_failures[model] = size
+            return
+        first_failures[model] = min(first, size)
+        threshold = max(first, size)
+        full_fail = progress.setdefault('full_fail_size', {})
+        if threshold < full_fail.get(model, threshold + 1):
+            full_fail[model] = threshold
+
+
+def _record_full_success(progress: dict, model: str, size: int) -> None:
+    """A full body of `size` chars translated in one request: an earlier failure at or below it was transient."""
+    with _FULL_FAIL_LOCK:
+        first_failures = progress.get('full_fail_first', {})
+        if first_failures.get(model, size + 1) <= size:
+            first_failures.pop(model, None)
+
+
+def _race_models(api_base: str, models: list[str], prompt: str, block: str, debug: bool = False,
+                 chapter_info: str = None) -> tuple[str, str] | None:
+    """
+    Send the same full translation to several models at once.
+    Returns (translation, model) from the first model to answer with a valid translation, or None if all failed.
+    Once a model has won, the requests of the others are aborted, and the race returns when they have stopped.
+    """
+    session = _AbortableSession()
+    pool = ThreadPoolExecutor(max_workers=len(models))
+    try:
+        futures = {pool.submit(_translate_once, api_base, model, prompt, block, debug, chapter_info, None, session): model
+                   for model in models}
+        for future in as_completed(futures):
+            try:
+                return future.result(), futures[future]
+            except TranslationError as e:
+                logger.warning("%sFull translate with %s failed: %s", 
+                               f"{chapter_info} " if chapter_info else "", futures[future], e)
+        return None
+    finally:
+        session.abort()
+        pool.shutdown(wait=True)
+        session.close()
+
+
 def translate_with_chunking(api_base: str, models: str | list[str], prompt: str, html: str, progress: dict, 
-                          debug: bool = False, chapter_info: str = None) -> tuple[str, str]:
+                          debug: bool = False, chapter_info: str = None, concurrency: int = 1,
+                          parallel_models: int = 1) -> tuple[str, str]:
     """
     Translate HTML with intelligent chunking and model fallback.
     
@@ -274,6 +561,9 @@ def translate_with_chunking(api_base: str, models: str | list[str], prompt: str,
         progress: Progress tracking dictionary
         debug: Enable debug logging
         chapter_info: Optional chapter context for logging (e.g., "Chapter 1/5")
+        concurrency: Maximum number of chunks of one chapter translated at the same time
+        parallel_models: Number of models (from the start of the list) asked for the full translation
+            at the same time; the first valid answer wins, chunking is only tried if they all fail
         
     Returns:
         tuple[str, str]: (translated_html, successful_model_name)
@@ -295,134 +585,197 @@ def translate_with_chunking(api_base: str, models: str | list[str], prompt: str,
     logger.debug("%sExtracted structure: prefix=%d chars, body=%d chars, suffix=%d chars", 
                 chapter_prefix, len(prefix), len(body_content), len(suffix))
     
+    # Top-level elements of the body, scanned once for all chunk sizes and models
+    body_blocks = None
+    
+    # Race the full translation across the first models instead of waiting for each one to fail
+    raced_models = set()
+    if parallel_models > 1 and len(model_list) > 1:
+        full_fail = progress.get('full_fail_size', {})
+        raced_models = {model for model in model_list[:parallel_models]
+                        if full_fail.get(model, len(body_content) + 1) > len(body_content)}
+        if len(raced_models) > 1:
+            logger.debug("%sRacing full translation with %s", chapter_prefix, ", ".join(raced_models))
+            raced = _race_models(api_base, [m for m in model_list if m in raced_models], prompt, 
+                                 body_content, debug, chapter_info)
+            if raced is not None:
+                translated_body, model = raced
+                logger.debug("%sFull translation successful with %s", chapter_prefix, model)
+                _record_full_success(progress, model, len(body_content))
+                return wrap_html_content(translated_body, prefix, suffix), model
+        else:
+            raced_models = set()
+    
     # Try each model in sequence
     for model_idx, model in enumerate(model_list):
         logger.debug("%sTrying model %s (%d/%d)", chapter_prefix, model, model_idx + 1, len(model_list))
         
-        try:
-            # Try full translation first - only send body content
-            logger.debug("%sAttempting full translation with %s", chapter_prefix, model)
-            translated_body = _translate_once(api_base, model, prompt, body_content, debug, chapter_info)
-            
-            # Wrap the translated body with the original HTML structure
-            full_translated = wrap_html_content(translated_body, prefix, suffix)
-            logger.debug("%sFull translation successful with %s", chapter_prefix, model)
-            return full_translated, model
-            
-        except TranslationError as e:
-            logger.warning("%sFull translate with %s failed: %s", chapter_prefix, model, e)
-            
-            # Try chunking with progressively halved sizes
-            # Start with body content size and halve until we get manageable chunks
-            initial_size = len(body_content)
-            
-            # Check if we have a previously successful chunk size to start with
-            preferred_chunk_size = progress.get('preferred_chunk_size')
-            if preferred_chunk_size and preferred_chunk_size < initial_size:
-                logger.debug("%sUsing previously successful chunk size: %d", chapter_prefix, preferred_chunk_size)
-                chunk_size = preferred_chunk_size
-            else:
-                chunk_size = min(initial_size // 2, 16000)  # Start with half the content or 16k, whichever is smaller
-            
-            min_chunk_size = 2000  # Don't go below 2k characters
-            
-            while chunk_size >= min_chunk_size:
-                if chunk_size >= initial_size:
-                    # If chunk size is larger than content, reduce and try again
-                    chunk_size = chunk_size // 2
-                    continue
-                    
-                logger.debug("%sTrying chunking with %s, chunk size %d (body content size: %d)", 
-                           chapter_prefix, model, chunk_size, initial_size)
-                try:
-                    # Split only the body content, then wrap each chunk
-                    body_chunks = smart_html_split(body_content, chunk_size)
-                    chunks = [wrap_html_content(body_chunk, prefix, suffix) for body_chunk in body_chunks]
-                    logger.debug("%sCreated %d chunks of target size %d with %s", chapter_prefix, len(chunks), chunk_size, model)
-                    
-                    translated_chunks = []
-                    chunk_failed = False
-                    
-                    for i, chunk in enumerate(chunks):
-                        chunk_prefix = f"{chapter_prefix}Chunk {i+1}/{len(chunks)} "
-                        logger.debug("%sTranslating chunk %d/%d with %s (length: %d chars)", 
-                                   chapter_prefix, i+1, len(chunks), model, len(chunk))
-                        try:
-                            # Track timing for this chunk
-                            chunk_start = time.time()
-                            
-                            # Extract body from this chunk to send to model
-                            _, chunk_body, _ = extract_html_structure(chunk)
-                            translated_body = _translate_once(api_base, model, prompt, chunk_body, debug, 
-                                                           chapter_info, f"Chunk {i+1}/{len(chunks)}")
-                            # Wrap the translated body with the original structure
-                            translated_chunk = wrap_html_content(translated_body, prefix, suffix)
-                            translated_chunks.append(translated_chunk)
-                            
-                            # Calculate timing and speed
+        # Bodies this large already failed in one request with this model (twice, see
+        # _record_full_failure), then succeeded chunked: go straight to chunking
+        full_fail_size = progress.get('full_fail_size', {}).get(model)
+        full_failed = False
+        if model in raced_models:
+            logger.debug("%sFull translation with %s already failed in the race", chapter_prefix, model)
+            full_failed = True
+        elif full_fail_size is not None and len(body_content) >= full_fail_size:
+            logger.debug("%sSkipping full translation with %s: bodies of %d+ chars needed chunking before", 
+                        chapter_prefix, model, full_fail_size)
+        else:
+            try:
+                # Try full translation first - only send body content
+                logger.debug("%sAttempting full translation with %s", chapter_prefix, model)
+                translated_body = _translate_once(api_base, model, prompt, body_content, debug, chapter_info)
+                
+                # Wrap the translated body with the original HTML structure
+                full_translated = wrap_html_content(translated_body, prefix, suffix)
+                logger.debug("%sFull translation successful with %s", chapter_prefix, model)
+                _record_full_success(progress, model, len(body_content))
+                return full_translated, model
+                
+            except TranslationError as e:
+                logger.warning("%sFull translate with %s failed: %s", chapter_prefix, model, e)
+                full_failed = True
+        
+        # Try chunking with progressively halved sizes
+        # Start with body content size and halve until we get manageable chunks
+        initial_size = len(body_content)
+        
+        # Check if we have a previously successful chunk size to start with
+        preferred_chunk_size = progress.get('preferred_chunk_size')
+        if preferred_chunk_size and preferred_chunk_size < initial_size:
+            logger.debug("%sUsing previously successful chunk size: %d", chapter_prefix, preferred_chunk_size)
+            chunk_size = preferred_chunk_size
+        else:
+            chunk_size = min(initial_size // 2, 16000)  # Start with half the content or 16k, whichever is smaller
+        
+        min_chunk_size = 2000  # Don't go below 2k characters
+        
+        while chunk_size >= min_chunk_size:
+            if chunk_size >= initial_size:
+                # If chunk size is larger than content, reduce and try again
+                chunk_size = chunk_size // 2
+                continue
+                
+            logger.debug("%sTrying chunking with %s, chunk size %d (body content size: %d)", 
+                       chapter_prefix, model, chunk_size, initial_size)
+            try:
+                # Split only the body content; chunks are sent and merged without their wrapper
+                if body_blocks is None:
+                    body_blocks = _top_level_blocks(body_content)
+                chunks = pack_html_blocks(body_content, chunk_size, body_blocks)
+                # Size of a chunk as a full document, for the "small chunk" threshold below
+                first_chunk_size = len(prefix) + len(chunks[0]) + len(suffix) if chunks else 0
+                logger.debug("%sCreated %d chunks of target size %d with %s", chapter_prefix, len(chunks), chunk_size, model)
+                
+                def translate_chunk(i: int, chunk_body: str) -> str:
+                    logger.debug("%sTranslating chunk %d/%d with %s (length: %d chars)", 
+                               chapter_prefix, i+1, len(chunks), model, len(chunk_body))
+                    try:
+                        # Track timing for this chunk
+                        chunk_start = time.time()
+                        
+                        translated_body = _translate_once(api_base, model, prompt, chunk_body, debug, 
+                                                       chapter_info, f"Chunk {i+1}/{len(chunks)}")
+                        
+                        # Calculate timing and speed
+                        if logger.isEnabledFor(logging.DEBUG):
                             chunk_elapsed = time.time() - chunk_start
                             chars_per_min = int((len(chunk_body) * 60) / chunk_elapsed) if chunk_elapsed > 0 else 0
                             logger.debug("%sChunk %d/%d ✅ %s - %.1fs (%d chars/min) - %d chars", 
                                        chapter_prefix, i+1, len(chunks), model, chunk_elapsed, chars_per_min, len(translated_body))
-                        except TranslationError as chunk_error:
-                            logger.warning("%sChunk %d/%d translation failed with %s: %s", 
-                                         chapter_prefix, i+1, len(chunks), model, chunk_error)
-                            # If chunk is small (< 4k) and still failing, try next model
-                            if len(chunk) < 4000 and model_idx < len(model_list) - 1:
-                                logger.info("%sChunk < 4k chars failed with %s, will try next model", 
-                                          chapter_prefix, model)
-                                chunk_failed = True
-                                break
-                            else:
-                                # Try smaller chunks by halving
-                                chunk_failed = True
-                                break
-                    
-                    if not chunk_failed:
-                        # All chunks successful - merge body content and wrap once
-                        logger.debug("%sAll chunks translated successfully with %s, merging results", chapter_prefix, model)
-                        
-                        # Extract body content from each translated chunk and merge
-                        merged_body_parts = []
-                        for translated_chunk in translated_chunks:
-                            _, chunk_body, _ = extract_html_structure(translated_chunk)
-                            merged_body_parts.append(chunk_body)
-                        
-                        # Merge all body parts and wrap with original structure
-                        merged_body = ''.join(merged_body_parts)
-                        result = wrap_html_content(merged_body, prefix, suffix)
-                        
-                        logger.debug("%sChunked translation completed successfully with %s", chapter_prefix, model)
-                        # Update progress with chunk information and remember successful chunk size
-                        progress['chunk_parts'] = len(chunks)
-                        progress['preferred_chunk_size'] = chunk_size
-                        logger.info("%sRemembering successful chunk size: %d chars for future chapters", chapter_prefix, chunk_size)
-                        return result, model
-                    elif len(chunks) > 0 and len(chunks[0]) < 4000:
-                        # Very small chunks failed, try next model
-                        break
-                        
-                except Exception as e:
-                    logger.error("%sChunking with %s, size %d failed: %s", chapter_prefix, model, chunk_size, e)
+                        return translated_body
+                    except TranslationError as chunk_error:
+                        logger.warning("%sChunk %d/%d translation failed with %s: %s", 
+                                     chapter_prefix, i+1, len(chunks), model, chunk_error)
+                        raise
                 
-                # Halve the chunk size for next iteration
-                chunk_size = chunk_size // 2
-                logger.debug("%sHalving chunk size to %d", chapter_prefix, chunk_size)
+                try:
+                    # Byte-identical chunks (repeated boilerplate) are translated once
+                    unique_chunks = list(dict.fromkeys(chunks))
+                    translated_unique = dict(zip(unique_chunks, _map_chunks(translate_chunk, unique_chunks, concurrency)))
+                    translated_chunks = [translated_unique[chunk] for chunk in chunks]
+                    chunk_failed = False
+                except TranslationError:
+                    # If chunks are small (< 4k) and still failing, try next model; otherwise halve
+                    if first_chunk_size < 4000 and model_idx < len(model_list) - 1:
+                        logger.info("%sChunk < 4k chars failed with %s, will try next model", 
+                                  chapter_prefix, model)
+                    chunk_failed = True
+                
+                if not chunk_failed:
+                    # All chunks successful - merge body content and wrap once
+                    logger.debug("%sAll chunks translated successfully with %s, merging results", chapter_prefix, model)
+                    
+                    # Merge all body parts and wrap with original structure
+                    merged_body = ''.join(translated_chunks)
+                    result = wrap_html_content(merged_body, prefix, suffix)
+                    
+                    logger.debug("%sChunked translation completed successfully with %s", chapter_prefix, model)
+                    # Update progress with chunk information and remember successful chunk size
+                    progress['chunk_parts'] = len(chunks)
+                    progress['preferred_chunk_size'] = chunk_size
+                    if full_failed:
+                        _record_full_failure(progress, model, initial_size)
+                    logger.info("%sRemembering successful chunk size: %d chars for future chapters", chapter_prefix, chunk_size)
+                    return result, model
+                elif len(chunks) > 0 and first_chunk_size < 4000:
+                    # Very small chunks failed, try next model
+                    break
+                    
+            except Exception as e:
+                logger.error("%sChunking with %s, size %d failed: %s", chapter_prefix, model, chunk_size, e)
             
-            # If we're here, this model failed entirely
-            if model_idx < len(model_list) - 1:
-                logger.info("%sModel %s failed entirely, trying next model", chapter_prefix, model)
-                continue
-            else:
-                logger.error("%sAll models failed", chapter_prefix)
-                raise TranslationError(f"All models ({', '.join(model_list)}) failed")
+            # Halve the chunk size for next iteration
+            chunk_size = chunk_size // 2
+            logger.debug("%sHalving chunk size to %d", chapter_prefix, chunk_size)
+        
+        # If we're here, this model failed entirely
+        if model_idx < len(model_list) - 1:
+            logger.info("%sModel %s failed entirely, trying next model", chapter_prefix, model)
+            continue
+        else:
+            logger.error("%sAll models failed", chapter_prefix)
+            raise TranslationError(f"All models ({', '.join(model_list)}) failed")
     
     # Should never reach here
     raise TranslationError("All models failed")
 
 
+def wait_debug_writes() -> None:
+    """Block until the debug-lastcall.json writes queued so far are on disk."""
+    _DEBUG_WRITER.submit(lambda: None).result()
+
+
+def _write_debug_lastcall(debug_data: dict, resp, context_prefix: str = "", path: Path = None) -> None:
+    """
+    Save the last request, and its response when one arrived, to debug-lastcall.json.
+    Single atomic write per call, run on the _DEBUG_WRITER thread so the request path never waits on disk.
+    """
+    path = path or Path(_DEBUG_LASTCALL)
+    try:
+        if resp is not None:
+            response = {
+                'status_code': resp.status_code,
+                'headers': dict(resp.headers),
+                'content_length': len(resp.content or b'')
+            }
+            if resp.status_code == 200:
+                try:
+                    response['json'] = json_loads(resp.content)
+                except ValueError:
+                    response['text_sample'] = resp.text[:500]
+            else:
+                response['error_text'] = resp.text[:500]
+            debug_data['response'] = response
+        tmp = path.with_name(f'{path.name}.{threading.get_ident()}.tmp')
+        tmp.write_bytes(json_dumps(debug_data, indent=True))
+        os.replace(tmp, path)
+    except Exception as debug_err:
+        logger.warning("%sFailed to write %s: %s", context_prefix, path, debug_err)
+
+
 def _translate_once(api_base: str, model: str, prompt: str, block: str, debug: bool = False, 
-                   chapter_info: str = None, chunk_info: str = None) -> str:
+                   chapter_info: str = None, chunk_info: str = None, session: requests.Session = None) -> str:
     """
     Make a single translation request. No retries - if it fails, let the caller handle it.
     
@@ -434,6 +787,7 @@ def _translate_once(api_base: str, model: str, prompt: str, block: str, debug: b
         debug: Enable debug logging
         chapter_info: Optional chapter context (e.g., "Chapter 1/5")
         chunk_info: Optional chunk context (e.g., "Chunk 1/5")
+        session: Session to send the request with (defaults to the shared _SESSION)
     """
     url = api_base.rstrip('/') + '/api/chat'
     
@@ -447,6 +801,20 @@ def _translate_once(api_base: str, model: str, prompt: str, block: str, debug: b
     elif chunk_info:
         context_prefix = f"{chunk_info} "
     
+    cache_key = hash_key('\x00'.join((model, prompt, block)))
+    with _TRANSLATION_CACHE_LOCK:
+        cached = _TRANSLATION_CACHE.get(cache_key)
+        if cached is not None:
+            _TRANSLATION_CACHE.move_to_end(cache_key)
+    cache_dir = _CACHE_DIR
+    if cached is None and cache_dir is not None:
+        cached = _read_cached_translation(cache_dir, cache_key, block)
+        if cached is not None:
+            _remember_translation(cache_key, cached)
+    if cached is not None:
+        logger.debug("%sReusing cached translation from %s (%d chars)", context_prefix, model, len(cached))
+        return cached
+    
     payload = {
         'model': model,
         'messages': [
@@ -457,7 +825,7 @@ def _translate_once(api_base: str, model: str, prompt: str, block: str, debug: b
         'stream':False
     }
     
-    # Write debug info to file if debug mode is enabled
+    # Debug record of this call, written once the outcome is known
     if debug:
         debug_data = {
             'timestamp': datetime.now().isoformat(),
@@ -471,43 +839,25 @@ def _translate_once(api_base: str, model: str, prompt: str, block: str, debug: b
                 'chunk': chunk_info
             }
         }
-        try:
-            with open('debug-lastcall.json', 'w', encoding='utf-8') as f:
-                json.dump(debug_data, f, indent=2, ensure_ascii=False)
-        except Exception as debug_err:
-            logger.warning("%sFailed to write debug-lastcall.json: %s", context_prefix, debug_err)
     
     try:
         logger.debug("%sMaking translation request with model %s, block length: %d chars", 
                     context_prefix, model, len(block))
-        resp = requests.post(url, json=payload, timeout=300)
-        
-        # Update debug file with response if debug mode is enabled
-        if debug:
-            try:
-                with open('debug-lastcall.json', 'r', encoding='utf-8') as f:
-                    debug_data = json.load(f)
-                debug_data['response'] = {
-                    'status_code': resp.status_code,
-                    'headers': dict(resp.headers),
-                    'content_length': len(resp.text) if resp.text else 0
-                }
-                if resp.status_code == 200:
-                    try:
-                        debug_data['response']['json'] = resp.json()
-                    except:
-                        debug_data['response']['text_sample'] = resp.text[:500]
-                else:
-                    debug_data['response']['error_text'] = resp.text[:500]
-                with open('debug-lastcall.json', 'w', encoding='utf-8') as f:
-                    json.dump(debug_data, f, indent=2, ensure_ascii=False)
-            except Exception as debug_err:
-                logger.warning("%sFailed to update debug-lastcall.json with response: %s", context_prefix, debug_err)
+        resp = None
+        try:
+            # Encoded with orjson when available: the block is often 10k+ chars of non-ASCII text
+            resp = (session or _SESSION).post(url, data=json_dumps(payload), headers=_JSON_HEADERS, timeout=300)
+        finally:
+            if debug:
+                # Resolved now: the writer thread may run after the working directory changed
+                _DEBUG_WRITER.submit(_write_debug_lastcall, debug_data, resp, context_prefix,
+                                     Path(_DEBUG_LASTCALL).absolute())
         
         resp.raise_for_status()
         
         try:
-            resp_json = resp.json()
+            # orjson when available: long completions make this a sizeable parse
+            resp_json = json_loads(resp.content)
             
             if 'message' not in resp_json:
                 raise ValueError("Invalid API response format: missing 'message' field")
@@ -525,14 +875,18 @@ def _translate_once(api_base: str, model: str, prompt: str, block: str, debug: b
             
             if not valid:
                 logger.debug("%sValidation failed: %s", context_prefix, error_cleaned)
-                logger.debug("%sOriginal has <p> tags: %d, Translation has <p> tags: %d", 
-                           context_prefix, block.count('<p>'), content.count('<p>'))
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("%sOriginal has <p> tags: %d, Translation has <p> tags: %d", 
+                               context_prefix, block.count('<p>'), content.count('<p>'))
                 raise TranslationError(f"Translation validation failed: {error_cleaned}")
             
             # Use the cleaned content
             content = cleaned_content
             
             logger.debug("%sTranslation successful, content length: %d chars", context_prefix, len(content))
+            _remember_translation(cache_key, content)
+            if cache_dir is not None:
+                _write_cached_translation(cache_dir, cache_key, content)
             return content
             
         except (KeyError, ValueError, TypeError) as json_err:
@@ -540,52 +894,10 @@ def _translate_once(api_base: str, model: str, prompt: str, block: str, debug: b
             raise TranslationError(f"Invalid API response: {json_err}")
             
     except Exception as e:
-        logger.error("%sTranslation request failed: %s", context_prefix, e)
+        if getattr(session, 'aborted', False):
+            # Another model won the race this request was part of
+            logger.debug("%sRequest to %s aborted: %s", context_prefix, model, e)
+        else:
+            logger.error("%sTranslation request failed: %s", context_prefix, e)
         raise TranslationError(f"Translation failed: {e}")
 
-
-def extract_html_structure(html: str) -> tuple[str, str, str]:
-    """
-    Extract HTML structure parts: (prefix, body_content, suffix).
-    
-    This separates the XML declaration, DOCTYPE, <html>, <head> tags (prefix)
-    from the actual body content, and the closing tags (suffix).
-    
-    Args:
-        html: Full HTML document string
-        
-    Returns:
-        tuple[str, str, str]: (prefix, body_content, suffix)
-        - prefix: Everything before <body> content (XML, DOCTYPE, html, head tags)
-        - body_content: Just the content inside <body> tags
-        - suffix: Everything after body content (closing </body>, </html> tags)
-    """
-    # Pattern to match everything up to and including <body> tag
-    body_start_pattern = r'^(.*?<body[^>]*>)(.*?)(<\/body>.*?)$'
-    
-    match = re.search(body_start_pattern, html, re.DOTALL | re.IGNORECASE)
-    
-    if match:
-        prefix = match.group(1)  # Everything up to and including <body>
-        body_content = match.group(2)  # Content inside <body> tags
-        suffix = match.group(3)  # </body> and everything after
-        return prefix, body_content, suffix
-    else:
-        # If no body tags found, treat entire content as body
-        logger.warning("No <body> tags found in HTML, treating entire content as body")
-        return "", html, ""
-
-
-def wrap_html_content(body_content: str, prefix: str, suffix: str) -> str:
-    """
-    Wrap translated body content back into the original HTML structure.
-    
-    Args:
-        body_content: Translated content (what goes inside <body> tags)
-        prefix: Original prefix (XML, DOCTYPE, html, head, <body> tags)
-        suffix: Original suffix (</body>, </html> tags)
-        
-    Returns:
-        str: Complete HTML document with translated content
-    """
-    return prefix + body_content + suffix
\ No newline at end of file
@@ -5,6 +5,16 @@ from pathlib import Path
 from ebooklib import epub
 import ebooklib
 
+from libs.translation import clear_translation_cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_translation_cache():
+    """Keep memoized translations from leaking between tests."""
+    clear_translation_cache()
+    yield
+    clear_translation_cache()
+
 
 @pytest.fixture
 def temp_dir():
@@ -93,3 +103,12 @@ def mock_translation_response():
             "content": "<p>Ceci est un texte traduit en français.</p>"
         }
     }
+
+
+@pytest.fixture(autouse=True)
+def clear_epub_cache():
+    """Parsed books are cached per process; don't leak mocked books between tests."""
+    import cli
+    cli._read_epub_cached.cache_clear()
+    cli._chapter_index.cache_clear()
+    yield
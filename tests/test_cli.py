@@ -1,15 +1,23 @@
 import pytest
 import argparse
+import asyncio
+import json
 from pathlib import Path
 from unittest.mock import Mock, patch, mock_open
 import tempfile
 import io
 import sys
+import threading
+from ebooklib import epub
+import ebooklib
 
 from cli import (
     truncate_text, extract_plaintext, run_model_translation,
-    write_markdown, main, DEFAULT_MODELS
+    compare_models, translate_chunks, write_markdown, main, DEFAULT_MODELS,
+    load_book, get_chapter_info, _chapter_title, _csv_tuple
 )
+from libs.epub_utils import hash_key, html_text, parse_html, load_progress
+from libs.translation import TranslationError
 
 
 class TestTruncateText:
@@ -67,6 +75,20 @@ class TestTruncateText:
             # Should truncate at the sentence ending since it's after 50% of content
             assert result.endswith(ending), f"Expected ending '{ending}' but got '{result[-10:]}'"
     
+    def test_truncation_at_last_sentence_end(self):
+        """Test truncation keeps the longest complete sentence run."""
+        text = " ".join(["word"] * 600) + ". " + " ".join(["word"] * 200) + "! " + " ".join(["word"] * 500)
+        result = truncate_text(text, word_limit=1000)
+        
+        assert result.endswith("!")
+        assert len(result.split()) == 800
+    
+    def test_truncation_at_unicode_ellipsis(self):
+        """Test that the single-character ellipsis counts as a sentence end."""
+        text = " ".join(["word"] * 600) + "… " + " ".join(["word"] * 500)
+        result = truncate_text(text, word_limit=1000)
+        assert result.endswith("…")
+    
     def test_whitespace_handling(self):
         """Test proper whitespace handling in truncation."""
         text = "  word1   word2   word3  "
@@ -128,6 +150,100 @@ class TestExtractPlaintext:
         assert result == ""
 
 
+class TestLoadBook:
+    """Test the parsed EPUB cache."""
+    
+    def test_book_parsed_once(self):
+        """Test that repeated loads of an unchanged file reuse the same book."""
+        with patch('cli.epub.read_epub', wraps=epub.read_epub) as mock_read:
+            first = load_book(Path('tests/andersen.epub'))
+            second = load_book(Path('tests/andersen.epub'))
+        
+        assert first is second
+        assert mock_read.call_count == 1
+    
+    def test_helpers_accept_loaded_book(self):
+        """Test that chapter helpers give the same answer for a path or a book."""
+        path = Path('tests/andersen.epub')
+        book = load_book(path)
+        
+        assert extract_plaintext(book, "en", chapter_only=1) == extract_plaintext(path, "en", chapter_only=1)
+        assert get_chapter_info(book, 1) == get_chapter_info(path, 1)
+    
+    @patch('cli.translate_with_fallback', return_value=("<p>Traduit</p>", "mistral"))
+    def test_translation_leaves_cached_book_untouched(self, mock_translate, tmp_path):
+        """Test that injecting translations does not alter the book other callers get from the cache."""
+        path = Path('tests/andersen.epub')
+        from libs.epub_utils import get_html_chunks
+        _, original = get_html_chunks(load_book(path), chapter_only=1)[0]
+        test_args = [
+            "cli.py", "-f", str(path), "-l", "french", "--chapter", "1",
+            "--workspace", str(tmp_path / "progress.json"), "-o", str(tmp_path / "out.epub")
+        ]
+        
+        with patch.object(sys, 'argv', test_args), patch('cli.setup_logging'):
+            main()
+        
+        assert (tmp_path / "out.epub").exists()
+        assert get_html_chunks(load_book(path), chapter_only=1)[0][1] == original
+
+
+class TestChapterIndex:
+    """Test lazy discovery of valid chapters."""
+    
+    def test_first_chapter_stops_early(self):
+        """Test that asking for chapter 1 does not parse the whole book."""
+        book = load_book(Path('tests/andersen.epub'))
+        total_documents = len(list(book.get_items_of_type(ebooklib.ITEM_DOCUMENT)))
+        
+        with patch('cli.html_text', wraps=html_text) as mock_text:
+            title, word_count = get_chapter_info(book, 1)
+        
+        assert word_count >= 200
+        assert mock_text.call_count < total_documents
+    
+    def test_lazy_and_full_walk_agree(self):
+        """Test that chapters found lazily match a full walk of the book."""
+        book = load_book(Path('tests/andersen.epub'))
+        second = extract_plaintext(book, "en", chapter_only=2)
+        full = extract_plaintext(book, "en")
+        
+        assert second
+        assert second in full
+        assert extract_plaintext(book, "en", chapter_only=999) == ""
+
+    def test_same_numbering_as_translation(self):
+        """Test that --compare and translation pick the same document for a chapter number."""
+        from libs.epub_utils import get_html_chunks
+        book = epub.EpubBook()
+        items = []
+        for name in ["cover.xhtml", "part1.xhtml"]:
+            item = epub.EpubHtml(title=name, file_name=name, lang='en')
+            item.content = f"<html><body><p>{' '.join([name] * 250)}</p></body></html>"
+            book.add_item(item)
+            items.append(item)
+        book.spine = items
+        
+        for chapter in (1, 2):
+            _, raw = get_html_chunks(book, chapter_only=chapter)[0]
+            assert extract_plaintext(book, "en", chapter_only=chapter) == html_text(raw)
+
+
+class TestChapterTitle:
+    """Test chapter title extraction."""
+    
+    def test_highest_level_heading_wins(self):
+        """Test that an h1 is preferred over an earlier h2."""
+        root = parse_html("<h2>Part One</h2><h1>The <em>Real</em> Title</h1><p>Text</p>")
+        assert _chapter_title(root, "Part One The Real Title Text") == "TheRealTitle"
+    
+    def test_first_line_fallback(self):
+        """Test that documents without headings use their first non-empty line."""
+        root = parse_html("<p>Once upon a time</p>")
+        assert _chapter_title(root, "\n  Once upon a time\nthere was") == "Once upon a time"
+        assert _chapter_title(None, "x" * 150) == "x" * 97 + "..."
+
+
 class TestRunModelTranslation:
     """Test model translation functionality."""
     
@@ -158,6 +274,25 @@ class TestRunModelTranslation:
         assert isinstance(elapsed, float)
         assert elapsed >= 0
     
+    @patch('cli.translate_with_chunking')
+    @patch('cli.get_html_chunks')
+    @patch('cli.epub.read_epub')
+    def test_plaintext_keeps_word_boundaries(self, mock_read_epub, mock_get_chunks, mock_translate):
+        """Test that words from adjacent blocks and notes are not glued together."""
+        mock_get_chunks.return_value = [(Mock(), b'<p>Original</p>')]
+        mock_translate.return_value = (
+            "<p>Premier</p>\n<p>Second [Translator's note: Une note]</p>", 'test-model'
+        )
+        
+        run = run_model_translation(
+            "test-model", 1, "en", Path("test.epub"),
+            "Test prompt", "http://localhost:11434"
+        )
+        
+        assert "Premier" in run.content.split()
+        assert "Second" in run.content.split()
+        assert "Une note" in run.content
+    
     @patch('cli.get_html_chunks')
     @patch('cli.epub.read_epub')
     def test_chapter_not_found(self, mock_read_epub, mock_get_chunks):
@@ -173,6 +308,127 @@ class TestRunModelTranslation:
             )
 
 
+class TestCompareModels:
+    """Test concurrent model comparison."""
+    
+    def test_all_models_collected(self):
+        """Test that every model gets an entry, failures included."""
+        def fake_translation(model, *args, **kwargs):
+            if model == "broken-model":
+                raise ValueError("boom")
+            return f"content from {model}", 1.0
+        
+        models = ["model-a", "broken-model", "model-b"]
+        with patch('cli.run_model_translation', side_effect=fake_translation):
+            outputs = asyncio.run(compare_models(
+                models, 1, "en", Path("test.epub"), "Test prompt", "http://localhost:11434"
+            ))
+        
+        assert list(outputs) == models
+        assert outputs["model-a"] == {'content': "content from model-a", 'time': 1.0, 'success': True}
+        assert outputs["model-b"]['success'] is True
+        assert outputs["broken-model"] == {'content': '', 'time': 0, 'success': False}
+    
+    def test_models_run_simultaneously(self):
+        """Test that every model is in flight at once, however many models there are."""
+        models = [f"model-{i}" for i in range(12)]
+        barrier = threading.Barrier(len(models), timeout=5)
+        
+        def fake_translation(model, *args, **kwargs):
+            barrier.wait()  # Raises BrokenBarrierError if some model never starts
+            return "content", 1.0
+        
+        with patch('cli.run_model_translation', side_effect=fake_translation):
+            outputs = asyncio.run(compare_models(
+                models, 1, "en", Path("test.epub"), "Test prompt", "http://localhost:11434"
+            ))
+        
+        assert all(data['success'] for data in outputs.values())
+
+
+class TestTranslateChunks:
+    """Test the concurrent chunk translation pipeline."""
+    
+    def _chunks(self, count):
+        return [(Mock(), f"<p>Chapter text {i}</p>".encode('utf-8')) for i in range(count)]
+    
+    def test_translations_keyed_by_chunk_hash(self, temp_dir):
+        """Test that results land under each chunk's own key whatever the completion order."""
+        chunks = self._chunks(5)
+        progress = {}
+        workspace = temp_dir / "progress.json"
+        
+        def fake_fallback(models, prompt, url, html, progress, **kwargs):
+            return html.replace("Chapter", "Chapitre"), models[0]
+        
+        with patch('cli.translate_with_fallback', side_effect=fake_fallback):
+            asyncio.run(translate_chunks(chunks, ["model"], "prompt", "http://localhost:11434",
+                                         progress, workspace, jobs=3, compact_every=2))
+        
+        for i in range(5):
+            assert progress['translated'][hash_key(f"Chapter text {i}")] == f"<p>Chapitre text {i}</p>"
+        # Final compaction must have persisted everything and emptied the journal
+        saved = json.loads(workspace.read_text(encoding='utf-8'))
+        assert len(saved['translated']) == 5
+        assert not workspace.with_suffix('.jsonl').exists()
+    
+    def test_cached_chunks_skipped(self, temp_dir):
+        """Test that already translated chunks are not sent again."""
+        chunks = self._chunks(2)
+        progress = {'translated': {hash_key("Chapter text 0"): "<p>done</p>"}}
+        
+        with patch('cli.translate_with_fallback', return_value=("<p>new</p>", "model")) as mock_fallback:
+            asyncio.run(translate_chunks(chunks, ["model"], "prompt", "http://localhost:11434",
+                                         progress, temp_dir / "progress.json"))
+        
+        assert mock_fallback.call_count == 1
+        assert progress['translated'][hash_key("Chapter text 0")] == "<p>done</p>"
+    
+    def test_duplicate_chunks_translated_once(self, temp_dir):
+        """Test that identical chunks in a book cost a single request."""
+        chunks = self._chunks(2) + self._chunks(2)
+        progress = {}
+        
+        with patch('cli.translate_with_fallback', return_value=("<p>new</p>", "model")) as mock_fallback:
+            keys = asyncio.run(translate_chunks(chunks, ["model"], "prompt", "http://localhost:11434",
+                                                progress, temp_dir / "progress.json", jobs=4))
+        
+        assert mock_fallback.call_count == 2
+        assert keys[:2] == keys[2:]
+        assert all(key in progress['translated'] for key in keys)
+    
+    def test_resumed_run_skips_html_parse(self, temp_dir):
+        """Test that chunk keys remembered from a previous run are reused without parsing."""
+        chunks = self._chunks(3)
+        progress = {}
+        workspace = temp_dir / "progress.json"
+        
+        with patch('cli.translate_with_fallback', return_value=("<p>new</p>", "model")):
+            first = asyncio.run(translate_chunks(chunks, ["model"], "prompt", "http://localhost:11434",
+                                                 progress, workspace))
+        
+        resumed = load_progress(workspace)
+        with patch('libs.epub_utils.chunk_text') as mock_text, patch('cli.translate_with_fallback') as mock_fallback:
+            second = asyncio.run(translate_chunks(chunks, ["model"], "prompt", "http://localhost:11434",
+                                                  resumed, workspace))
+        
+        assert second == first
+        mock_text.assert_not_called()
+        mock_fallback.assert_not_called()
+    
+    def test_failure_stops_scheduling(self, temp_dir):
+        """Test that a chapter failing with every model stops the remaining ones."""
+        chunks = self._chunks(4)
+        progress = {}
+        
+        with patch('cli.translate_with_fallback', side_effect=TranslationError("All models failed")) as mock_fallback:
+            asyncio.run(translate_chunks(chunks, ["model"], "prompt", "http://localhost:11434",
+                                         progress, temp_dir / "progress.json", jobs=1))
+        
+        assert mock_fallback.call_count == 1
+        assert progress['translated'] == {}
+
+
 class TestWriteMarkdown:
     """Test markdown output writing functionality."""
     
@@ -410,6 +666,11 @@ class TestModelArgumentParsing:
         for model in model_list:
             assert "," not in model, f"Model name '{model}' contains comma"
     
+    def test_csv_tuple_argument_type(self):
+        """Test the argparse type used by --model and --compare."""
+        assert _csv_tuple("dorian2b/vera, mistral:7b,,") == ("dorian2b/vera", "mistral:7b")
+        assert _csv_tuple("") == ()
+    
     @patch('cli.setup_logging')
     @patch('cli.translate_with_fallback')
     @patch('cli.get_html_chunks')
@@ -430,11 +691,11 @@ class TestModelArgumentParsing:
         
         with patch.object(sys, 'argv', test_args):
             with patch('cli.load_progress', return_value={'translated': {}}):
-                with patch('cli.save_progress'):
+                with patch('cli.save_progress'), patch('cli.append_progress'):
                     with patch('cli.inject_translations'):
                         with patch('cli.epub.write_epub'):
                             with patch('cli.convert_translator_notes_to_footnotes', return_value=("content", [])):
-                                with patch('cli.hash_key', return_value="test_key"):
+                                with patch('cli.chunk_key', return_value="test_key"):
                                     try:
                                         main()
                                     except SystemExit:
@@ -445,5 +706,5 @@ class TestModelArgumentParsing:
                                     call_args = mock_translate_fallback.call_args[0]
                                     models_used = call_args[0]  # First argument should be model list
                                     
-                                    expected_models = ["dorian2b/vera", "mistral:7b"]
+                                    expected_models = ("dorian2b/vera", "mistral:7b")
                                     assert models_used == expected_models
@@ -113,7 +113,7 @@ class TestErrorHandling:
     
     def test_translation_network_errors(self):
         """Test handling of various network errors."""
-        with patch('requests.post') as mock_post:
+        with patch('libs.translation._SESSION.post') as mock_post:
             # Timeout error
             mock_post.side_effect = requests.exceptions.Timeout("Request timeout")
             
@@ -136,11 +136,11 @@ class TestErrorHandling:
     
     def test_json_parsing_errors(self):
         """Test handling of JSON parsing errors."""
-        with patch('requests.post') as mock_post:
+        with patch('libs.translation._SESSION.post') as mock_post:
             # Invalid JSON response
             mock_response = Mock()
             mock_response.raise_for_status.return_value = None
-            mock_response.json.side_effect = json.JSONDecodeError("Invalid JSON", "", 0)
+            mock_response.content = b"<html>Bad gateway</html>"
             mock_post.return_value = mock_response
             
             with pytest.raises(TranslationError):
@@ -148,19 +148,19 @@ class TestErrorHandling:
     
     def test_malformed_api_response(self):
         """Test handling of malformed API responses."""
-        with patch('requests.post') as mock_post:
+        with patch('libs.translation._SESSION.post') as mock_post:
             mock_response = Mock()
             mock_response.raise_for_status.return_value = None
             
             # Missing 'message' key
-            mock_response.json.return_value = {"error": "Missing message"}
+            mock_response.content = json.dumps({"error": "Missing message"}).encode()
             mock_post.return_value = mock_response
             
             with pytest.raises(TranslationError):
                 _translate_once("http://localhost:11434", "model", "prompt", "<p>content</p>")
             
             # Missing 'content' key
-            mock_response.json.return_value = {"message": {"role": "assistant"}}
+            mock_response.content = json.dumps({"message": {"role": "assistant"}}).encode()
             
             with pytest.raises(TranslationError):
                 _translate_once("http://localhost:11434", "model", "prompt", "<p>content</p>")
@@ -311,7 +311,8 @@ class TestIntegrationErrorScenarios:
             with pytest.raises(TranslationError):
                 result, model_used = translate_with_chunking(
                     "http://localhost:11434", "model", "prompt", 
-                    "<p>Large content</p>" * 1000, progress, chapter_info="Chapter 1/5"
+                    "".join(f"<p>Large content {i}</p>" for i in range(1000)), progress,
+                    chapter_info="Chapter 1/5"
                 )
     
     def test_markdown_generation_with_mixed_results(self, temp_dir):
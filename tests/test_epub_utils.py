@@ -7,8 +7,8 @@ from unittest.mock import Mock, patch
 import hashlib
 
 from libs.epub_utils import (
-    normalize_language, hash_key, load_progress, save_progress,
-    get_html_chunks, inject_translations, setup_logging,
+    normalize_language, hash_key, load_progress, save_progress, append_progress,
+    get_html_chunks, inject_translations, setup_logging, html_text, has_min_words, chunk_text, chunk_key, stripped_text,
     detect_drm, DRM_NONE, DRM_LCP, DRM_ADOBE, DRM_BN, DRM_FAIRPLAY, DRM_UNKNOWN
 )
 
@@ -116,6 +116,133 @@ class TestProgressPersistence:
         assert progress_file.exists()
 
 
+class TestProgressJournal:
+    """Test append-only progress saving."""
+    
+    def test_appended_entries_are_loaded(self, temp_dir, sample_progress_data):
+        """Test that journal entries are merged on top of the full progress file."""
+        progress_file = temp_dir / "progress.json"
+        save_progress(progress_file, sample_progress_data)
+        append_progress(progress_file, "ghi789", "<p>Journal entry</p>")
+        append_progress(progress_file, "abc123", "<p>Newer translation</p>")
+        
+        loaded = load_progress(progress_file)
+        assert loaded['translated']['ghi789'] == "<p>Journal entry</p>"
+        assert loaded['translated']['abc123'] == "<p>Newer translation</p>"
+        assert loaded['chunk_parts'] == 4
+    
+    def test_journal_without_progress_file(self, temp_dir):
+        """Test resuming from a journal alone (killed before the first compaction)."""
+        progress_file = temp_dir / "progress.json"
+        append_progress(progress_file, "key", "<p>Only in journal</p>")
+        
+        assert load_progress(progress_file) == {'translated': {'key': "<p>Only in journal</p>"}}
+    
+    def test_truncated_line_ignored(self, temp_dir):
+        """Test that a partially written last line does not prevent resuming."""
+        progress_file = temp_dir / "progress.json"
+        append_progress(progress_file, "key", "<p>Complete</p>")
+        with progress_file.with_suffix('.jsonl').open('a', encoding='utf-8') as f:
+            f.write('{"key": "broken", "ht')
+        
+        assert load_progress(progress_file)['translated'] == {'key': "<p>Complete</p>"}
+    
+    def test_save_progress_compacts_journal(self, temp_dir, sample_progress_data):
+        """Test that a full save removes the journal it supersedes."""
+        progress_file = temp_dir / "progress.json"
+        append_progress(progress_file, "key", "<p>Entry</p>")
+        save_progress(progress_file, sample_progress_data)
+        
+        assert not progress_file.with_suffix('.jsonl').exists()
+        assert load_progress(progress_file) == sample_progress_data
+    
+    def test_stdlib_json_fallback(self, temp_dir, sample_progress_data):
+        """Test that progress files are identical in content with or without orjson."""
+        progress_file = temp_dir / "progress.json"
+        with patch('libs.epub_utils.orjson', None):
+            save_progress(progress_file, sample_progress_data)
+            append_progress(progress_file, "clé", "<p>Déjà traduit</p>")
+            raw = progress_file.read_text(encoding='utf-8')
+        
+        assert json.loads(raw) == sample_progress_data
+        loaded = load_progress(progress_file)
+        assert loaded['translated']['clé'] == "<p>Déjà traduit</p>"
+
+
+class TestHtmlText:
+    """Test fast plain-text extraction."""
+    
+    def test_text_from_bytes_with_xml_declaration(self):
+        """Test that full XHTML documents (as stored in EPUBs) are handled."""
+        raw = b'<?xml version="1.0" encoding="utf-8"?><html><body><p>Hello</p> <p>world</p></body></html>'
+        assert html_text(raw).split() == ["Hello", "world"]
+    
+    def test_text_from_str(self):
+        """Test that str input is accepted."""
+        assert html_text("<p>Caf\u00e9 cr\u00e8me</p>").strip() == "Caf\u00e9 cr\u00e8me"
+    
+    def test_style_script_and_title_are_not_text(self):
+        """Test that an inline stylesheet does not count as words of the page."""
+        css = "".join(f".c{i} {{ margin: 0; }}\n" for i in range(100))
+        raw = (f"<html><head><title>Contents</title><style>{css}</style><script>var x = 1;</script></head>"
+               f"<body><p>Only ten words on this page, nothing else here.</p></body></html>").encode()
+        assert html_text(raw).split() == "Only ten words on this page, nothing else here.".split()
+        assert not has_min_words(html_text(raw), 200)
+
+    def test_empty_input(self):
+        """Test that empty documents give empty text."""
+        assert html_text(b"") == ""
+        assert html_text("   ") == ""
+
+
+class TestChunkText:
+    """Test the text hashed into progress keys."""
+    
+    def test_matches_beautifulsoup_text(self):
+        """Test that keys stay compatible with progress files written with BeautifulSoup."""
+        from bs4 import BeautifulSoup
+        raw = (b"<?xml version='1.0' encoding='utf-8'?><!DOCTYPE html><html><head><title>T</title>"
+               b"<style>p {}</style><script>var x;</script></head><body><!-- note -->"
+               b"<p>D\xc3\xa9j\xc3\xa0&nbsp;vu &amp; <em>co</em>.</p>\n</body></html>")
+        assert chunk_text(raw) == BeautifulSoup(raw, 'lxml').get_text().strip()
+        assert chunk_text(b"") == ""
+
+    def test_indented_document_matches_beautifulsoup_text(self):
+        """Test that whitespace-only strings collapse like BeautifulSoup's, except in <pre>."""
+        from bs4 import BeautifulSoup
+        raw = (b"<html>\n  <head>\n    <title>T</title>\n  </head>\n  <body>\n    <p>A</p>\n"
+               b"    <p>B</p>  <p>C</p>\n    <pre>\n  code  </pre>\n  </body>\n</html>\n")
+        assert chunk_text(raw) == BeautifulSoup(raw, 'lxml').get_text().strip()
+        assert chunk_text(b"<body>\n  <p>A</p>\n  <p>B</p>\n</body>") == "A\nB"
+        assert chunk_text(b"<p>A</p>  <p>B</p>") == "A B"
+    
+    def test_stripped_text_matches_beautifulsoup(self):
+        """Test the get_text(strip=True) equivalent used to validate translations."""
+        from bs4 import BeautifulSoup
+        html = "<p> Un <b>mot</b> , </p>\n<!-- note --><p>&nbsp;deux&amp;trois </p>"
+        assert stripped_text(html) == BeautifulSoup(html, 'html.parser').get_text(strip=True)
+
+
+class TestHasMinWords:
+    """Test the bounded word counter."""
+    
+    def test_threshold_boundaries(self):
+        """Test counts just below, at and above the threshold."""
+        assert has_min_words("one two three", 3) is True
+        assert has_min_words("one two", 3) is False
+        assert has_min_words("  one\ttwo\nthree four ", 3) is True
+    
+    def test_zero_threshold(self):
+        """Test that any text satisfies a zero threshold."""
+        assert has_min_words("", 0) is True
+    
+    def test_matches_split_count(self):
+        """Test agreement with str.split() on mixed whitespace."""
+        text = "word\u00a0other  \n\n final"
+        assert has_min_words(text, len(text.split())) is True
+        assert has_min_words(text, len(text.split()) + 1) is False
+
+
 class TestGetHtmlChunks:
     """Test HTML chunk extraction from EPUB."""
     
@@ -156,6 +283,38 @@ class TestGetHtmlChunks:
         # With very low min_words, at least one chapter should qualify
         chunks = get_html_chunks(sample_epub, min_words=1)
         assert len(chunks) >= 0  # Might be 0 due to other filtering
+    
+    def test_reading_order_and_non_content_pages(self):
+        """Test that chunks follow the spine, and skip cover/toc pages only when asked to."""
+        from ebooklib import epub
+        
+        book = epub.EpubBook()
+        items = {}
+        for name in ["cover.xhtml", "part1.xhtml", "part2.xhtml", "toc.xhtml"]:
+            item = epub.EpubHtml(title=name, file_name=name, lang='en')
+            item.content = f"<html><body><p>{name} text</p></body></html>"
+            book.add_item(item)
+            items[name] = item
+        book.spine = [items["cover.xhtml"], items["part2.xhtml"], items["toc.xhtml"], items["part1.xhtml"]]
+        
+        chunks = get_html_chunks(book, min_words=1)
+        assert [item.file_name for item, _ in chunks] == ["cover.xhtml", "part2.xhtml", "toc.xhtml", "part1.xhtml"]
+        
+        chunks = get_html_chunks(book, min_words=1, skip_non_content=True)
+        assert [item.file_name for item, _ in chunks] == ["part2.xhtml", "part1.xhtml"]
+        assert get_html_chunks(book, chapter_only=2, min_words=1, skip_non_content=True)[0][0] is items["part1.xhtml"]
+
+    def test_concurrent_scan_matches_sequential(self):
+        """Test that checking documents on several threads keeps the same chunks, in order."""
+        from ebooklib import epub
+
+        book = epub.read_epub('tests/andersen.epub')
+        with patch('libs.epub_utils.os.cpu_count', return_value=1):
+            sequential = get_html_chunks(book)
+        with patch('libs.epub_utils.os.cpu_count', return_value=8):
+            concurrent = get_html_chunks(book)
+        assert sequential
+        assert [item.get_name() for item, _ in concurrent] == [item.get_name() for item, _ in sequential]
 
 
 class TestInjectTranslations:
@@ -190,6 +349,33 @@ class TestInjectTranslations:
             new_content = item.get_content().decode('utf-8')
             assert "Translated content" in new_content
     
+    def test_inject_translations_with_precomputed_keys(self):
+        """Test that precomputed keys are used instead of re-parsing chunks."""
+        item = Mock()
+        chunks = [(item, b'<p>Original text</p>')]
+        translations = {"precomputed": "<p>Texte traduit</p>"}
+        
+        with patch('libs.epub_utils.chunk_text') as mock_text:
+            count = inject_translations(chunks, translations, keys=["precomputed"])
+        
+        assert count == 1
+        mock_text.assert_not_called()
+        assert b"Texte traduit" in item.set_content.call_args[0][0]
+    
+    def test_inject_translations_with_raw_key_map(self):
+        """Test that chunks known by their raw bytes hash are not re-parsed."""
+        raw = b'<p>Original text</p>'
+        raw_to_key = {}
+        key = chunk_key(raw, raw_to_key)
+        assert key == hash_key("Original text")
+        
+        item = Mock()
+        with patch('libs.epub_utils.chunk_text') as mock_text:
+            count = inject_translations([(item, raw)], {key: "<p>Texte traduit</p>"}, raw_to_key=raw_to_key)
+        
+        assert count == 1
+        mock_text.assert_not_called()
+    
     def test_inject_translations_no_matches(self, sample_epub):
         """Test injection with no matching translations."""
         chunks = get_html_chunks(sample_epub)
@@ -446,7 +632,18 @@ class TestDRMDetection:
         epub_path = self.create_test_epub(temp_dir, drm_files)
         result = detect_drm(str(epub_path))
         assert result == DRM_FAIRPLAY
-    
+
+    def test_prefixed_encryption_method(self, temp_dir):
+        """Test algorithm detection with a namespace prefix and single quotes."""
+        encryption_xml = """<?xml version="1.0" encoding="UTF-8"?>
+<encryption xmlns:enc="http://www.w3.org/2001/04/xmlenc#">
+    <enc:EncryptedData>
+        <enc:EncryptionMethod Algorithm='http://ns.adobe.com/adept/xmlenc#aes128-cbc'/>
+    </enc:EncryptedData>
+</encryption>"""
+        epub_path = self.create_test_epub(temp_dir, {"META-INF/encryption.xml": encryption_xml})
+        assert detect_drm(str(epub_path)) == DRM_ADOBE
+
     def test_fairplay_drm_detection_via_sinf(self, temp_dir):
         """Test detection of Apple FairPlay DRM via sinf.xml files."""
         drm_files = {
@@ -92,7 +92,18 @@ class TestHtmlStructure(unittest.TestCase):
         # Verify reconstruction
         reconstructed = wrap_html_content(body_content, prefix, suffix)
         self.assertEqual(reconstructed, html)
-    
+
+    def test_extract_html_structure_is_lossless(self):
+        """Test upper-case tags, the first </body> winning, and a trailing newline kept in the suffix."""
+        html = '<HTML><BODY class="c">\n<p>One</p></BODY><p>After</p></body></HTML>\n'
+
+        prefix, body_content, suffix = extract_html_structure(html)
+
+        self.assertEqual(prefix, '<HTML><BODY class="c">')
+        self.assertEqual(body_content, '\n<p>One</p>')
+        self.assertEqual(suffix, '</BODY><p>After</p></body></HTML>\n')
+        self.assertEqual(wrap_html_content(body_content, prefix, suffix), html)
+
     def test_wrap_html_content(self):
         """Test wrapping content back into HTML structure."""
         prefix = '<?xml version="1.0"?><!DOCTYPE html><html><head></head><body>'
@@ -1,6 +1,6 @@
 import pytest
 import unittest
-from libs.translation import smart_html_split
+from libs.translation import smart_html_split, pack_html_blocks
 
 
 class TestSmartHtmlSplit(unittest.TestCase):
@@ -66,7 +66,37 @@ class TestSmartHtmlSplit(unittest.TestCase):
         
         # Check that the content length difference is minimal (within a few chars)
         self.assertLess(abs(len(combined) - len(html)), 10)
-    
+
+    def test_split_at_block_end_closest_to_target(self):
+        """Test that the split uses the block end nearest target_size, not the first one in range."""
+        paragraph = '<p>' + 'a' * 93 + '</p>'  # 100 chars
+        html = paragraph * 40
+        chunks = smart_html_split(html, 2000)
+
+        self.assertEqual([len(chunk) for chunk in chunks], [2000, 2000])
+        self.assertEqual(''.join(chunks), html)
+
+    def test_upper_case_block_ends_preferred(self):
+        """Test that upper-case closing tags are used as block boundaries too."""
+        paragraph = '<P>' + 'a' * 48 + '<B>b</B>' + 'a' * 37 + '</P>'  # 100 chars
+        html = paragraph * 40
+        chunks = smart_html_split(html, 2000)
+
+        self.assertEqual([len(chunk) for chunk in chunks], [2000, 2000])
+        self.assertTrue(all(chunk.endswith('</P>') for chunk in chunks))
+
+    def test_block_ends_scanned_once_across_sizes(self):
+        """Test that splitting the same html at several sizes locates its block ends once."""
+        from libs.translation import _block_end_spans
+        html = ''.join(f'<p>Paragraph {i} ' + 'text ' * 40 + '</p>' for i in range(200))
+        _block_end_spans.cache_clear()
+        
+        for size in (16000, 8000, 4000, 2000):
+            chunks = smart_html_split(html, size)
+            self.assertEqual(''.join(chunks), html)
+            self.assertTrue(all(chunk.endswith('</p>') for chunk in chunks))
+        self.assertEqual(_block_end_spans.cache_info().misses, 1)
+
     def test_small_content_not_split(self):
         """Test that content smaller than target size is not split."""
         small_html = "<p>This is a small paragraph.</p>"
@@ -149,3 +179,46 @@ class TestSmartHtmlSplit(unittest.TestCase):
             for i in range(1, len(sizes_tried)):
                 ratio = sizes_tried[i-1] / sizes_tried[i]
                 assert 1.8 <= ratio <= 2.2, f"Not proper halving: {sizes_tried[i-1]} -> {sizes_tried[i]}"
+
+
+class TestPackHtmlBlocks(unittest.TestCase):
+    """Test packing of whole top-level elements into chunks."""
+    
+    def test_chunks_hold_whole_elements(self):
+        """Test that nested blocks are never cut, and content is kept in order."""
+        section = '<div class="scene"><p>' + 'Some words here. ' * 20 + '</p><p>More text.</p></div>'
+        html = section * 30
+        chunks = pack_html_blocks(html, 2000)
+        
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(len(chunk), 2000)
+            self.assertTrue(chunk.startswith('<div class="scene">'))
+            self.assertTrue(chunk.endswith('</p></div>'))
+        self.assertEqual(''.join(chunks), html)
+    
+    def test_oversized_element_falls_back_to_smart_split(self):
+        """Test that a single element larger than the target is still split."""
+        html = '<div>' + '<p>Paragraph of text.</p>' * 500 + '</div>'
+        chunks = pack_html_blocks(html, 1000)
+        
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(''.join(chunks), html)
+
+    def test_tail_of_split_element_batched_with_next_blocks(self):
+        """Test that the leftover piece of a split element does not become a request of its own."""
+        big = '<div>' + '<p>Paragraph of text.</p>' * 90 + '</div>'
+        html = big + '<p>Short one.</p>' * 20
+        chunks = pack_html_blocks(html, 1000)
+
+        self.assertEqual(''.join(chunks), html)
+        self.assertTrue(chunks[-1].endswith('</div>' + '<p>Short one.</p>' * 20))
+        self.assertEqual(len(chunks), -(-len(html) // 1000))
+
+    def test_void_elements_and_comments(self):
+        """Test that void tags and commented-out tags do not unbalance the split."""
+        html = ('<p>Line<br>break</p><!-- <div> --><hr/>' + '<p>' + 'x' * 80 + '</p>') * 20
+        chunks = pack_html_blocks(html, 300)
+        
+        for chunk in chunks:
+            self.assertEqual(chunk.count('<p>'), chunk.count('</p>'))
@@ -1,12 +1,15 @@
 import pytest
+import time
 import responses
 from unittest.mock import patch, Mock
 import requests
 
 from libs.translation import (
     TranslationError, validate_translation, dynamic_chunks,
-    translate_with_chunking, _translate_once
+    translate_with_chunking, _translate_once, extract_html_structure,
+    clear_translation_cache, set_cache_dir, wait_debug_writes
 )
+from libs.epub_utils import stripped_text
 
 
 class TestValidateTranslation:
@@ -49,6 +52,16 @@ class TestValidateTranslation:
         # New validation checks HTML structure first, so expect HTML structure error
         assert ("output should start with" in error_cleaned.lower() or "paragraph tags missing" in error_cleaned.lower())
     
+    def test_pre_is_not_a_paragraph(self):
+        """Test that <pre>/<param> do not count as paragraph tags on either side."""
+        is_valid, _, _ = validate_translation("<pre>code sample here</pre>", "<pre>exemple de code ici</pre>")
+        assert is_valid is True
+
+        is_valid, error, _ = validate_translation('<div><p class="x">Texte original</p></div>',
+                                                  "<div><pre>Texte traduit sans paragraphe</pre></div>")
+        assert is_valid is False
+        assert "paragraph tags missing" in error.lower()
+
     def test_invalid_html(self):
         """Test validation fails for invalid HTML."""
         original = "<p>Valid original</p>"
@@ -71,6 +84,18 @@ class TestValidateTranslation:
         assert is_valid is False
         assert "translation too short" in error_cleaned.lower()
 
+    def test_text_check_without_parsing(self):
+        """Test that plain prose skips the HTML parse, while markup-heavy output is still parsed."""
+        original = "<p>Original</p>"
+        with patch('libs.translation.stripped_text', wraps=stripped_text) as parse:
+            assert validate_translation(original, "<p>Texte traduit</p>")[0] is True
+            parse.assert_not_called()
+
+            is_valid, error, _ = validate_translation(original, '<p>&hellip;&amp;&eacute;</p>')
+            parse.assert_called_once()
+        assert is_valid is False
+        assert "too little text" in error.lower()
+
 
 class TestDynamicChunks:
     """Test dynamic HTML chunking functionality."""
@@ -126,6 +151,13 @@ class TestDynamicChunks:
         
         assert total_content == html
 
+    def test_balanced_chunk_sizes(self):
+        """Test that the remainder is spread out and no chunk exceeds max_size."""
+        chunks = dynamic_chunks("x" * 1003, max_size=500)
+        sizes = [len(extract_html_structure(chunk)[1]) for chunk in chunks]
+
+        assert sizes == [251, 251, 251, 250]
+
 
 class TestTranslateOnce:
     """Test single translation attempt functionality."""
@@ -147,7 +179,35 @@ class TestTranslateOnce:
         
         result = _translate_once(api_base, model, prompt, block)
         assert result == "<p>Ceci est un texte traduit en français.</p>"
-    
+
+    @responses.activate
+    def test_repeated_block_served_from_cache(self, mock_translation_response):
+        """Test that an identical block is not requested twice, unless model or prompt change."""
+        api_base = "http://localhost:11434"
+        responses.add(responses.POST, f"{api_base}/api/chat", json=mock_translation_response, status=200)
+
+        first = _translate_once(api_base, "test-model", "Translate to French", "<p>Hello world</p>")
+        again = _translate_once(api_base, "test-model", "Translate to French", "<p>Hello world</p>")
+        assert again == first
+        assert len(responses.calls) == 1
+
+        _translate_once(api_base, "other-model", "Translate to French", "<p>Hello world</p>")
+        assert len(responses.calls) == 2
+
+    @responses.activate
+    def test_request_body_is_utf8_json(self, mock_translation_response):
+        """Test that the payload is sent as UTF-8 JSON with non-ASCII text kept as is."""
+        import json
+        api_base = "http://localhost:11434"
+        responses.add(responses.POST, f"{api_base}/api/chat", json=mock_translation_response, status=200)
+
+        _translate_once(api_base, "test-model", "Traduis en français", "<p>Hello world</p>")
+
+        request = responses.calls[0].request
+        assert request.headers['Content-Type'] == 'application/json'
+        assert 'français'.encode('utf-8') in request.body
+        assert json.loads(request.body)['messages'][1]['content'] == "<p>Hello world</p>"
+
     @responses.activate
     def test_successful_translation_with_validation(self):
         """Test successful translation that passes validation."""
@@ -229,6 +289,42 @@ class TestTranslateOnce:
         with pytest.raises(TranslationError):
             _translate_once(api_base, model, prompt, block)
 
+    @responses.activate
+    def test_debug_lastcall_written_once(self, temp_dir, monkeypatch, mock_translation_response):
+        """Test that debug mode records request and response in a single atomic write."""
+        import json
+        api_base = "http://localhost:11434"
+        responses.add(responses.POST, f"{api_base}/api/chat", json=mock_translation_response, status=200)
+        monkeypatch.chdir(temp_dir)
+
+        _translate_once(api_base, "test-model", "Translate to French", "<p>Hello world</p>", debug=True)
+        wait_debug_writes()
+
+        assert [p.name for p in temp_dir.iterdir()] == ["debug-lastcall.json"]
+        data = json.loads((temp_dir / "debug-lastcall.json").read_text(encoding='utf-8'))
+        assert data['payload']['messages'][1]['content'] == "<p>Hello world</p>"
+        assert data['response']['status_code'] == 200
+        assert data['response']['json'] == mock_translation_response
+
+
+    @responses.activate
+    def test_cache_dir_reused_across_runs(self, temp_dir, mock_translation_response):
+        """Test that translations stored in the cache directory answer later runs without a request."""
+        api_base = "http://localhost:11434"
+        responses.add(responses.POST, f"{api_base}/api/chat", json=mock_translation_response, status=200)
+        set_cache_dir(temp_dir / "cache")
+        try:
+            first = _translate_once(api_base, "test-model", "Translate to French", "<p>Hello world</p>")
+            assert len(list((temp_dir / "cache").glob("*.html"))) == 1
+
+            # A new process starts with an empty in-memory cache
+            clear_translation_cache()
+            again = _translate_once(api_base, "test-model", "Translate to French", "<p>Hello world</p>")
+        finally:
+            set_cache_dir(None)
+        assert again == first
+        assert len(responses.calls) == 1
+
 
 class TestTranslateWithChunking:
     """Test chunked translation functionality."""
@@ -279,7 +375,257 @@ class TestTranslateWithChunking:
         # Progress should be updated with chunk information
         assert 'chunk_parts' in progress
         assert progress['chunk_parts'] >= 1  # Changed from > 1 to >= 1
-    
+
+    @patch('libs.translation._translate_once')
+    def test_known_oversized_body_skips_full_attempt(self, mock_translate):
+        """Test that a body as large as ones that needed chunking twice is chunked right away."""
+        body = "<p>Large content, many paragraphs.</p>" * 200
+        smaller = "<p>Other content.</p>" * 200
+
+        def fake_translate(api_base, model, prompt, block, *args):
+            if block in (body, smaller):
+                raise TranslationError("Too large")
+            return "<p>Chunk translated</p>"
+        mock_translate.side_effect = fake_translate
+        progress = {}
+
+        translate_with_chunking("http://localhost:11434", "test-model", "prompt", body, progress)
+        assert 'full_fail_size' not in progress
+        translate_with_chunking("http://localhost:11434", "test-model", "prompt", body, progress)
+        assert progress['full_fail_size'] == {"test-model": len(body)}
+
+        mock_translate.reset_mock()
+        translate_with_chunking("http://localhost:11434", "test-model", "prompt", body, progress)
+        assert body not in [c.args[3] for c in mock_translate.call_args_list]
+
+        # Smaller bodies, or other models, still get a full attempt
+        mock_translate.reset_mock()
+        translate_with_chunking("http://localhost:11434", ["other-model"], "prompt", smaller, progress)
+        assert mock_translate.call_args_list[0].args[3] == smaller
+
+    @patch('libs.translation._translate_once')
+    def test_single_transient_failure_sets_no_threshold(self, mock_translate):
+        """Test that one failed full request (e.g. a timeout) does not disable full requests."""
+        body = "<p>Large content, many paragraphs.</p>" * 200
+        timeouts = [TranslationError("Read timed out")]
+
+        def fake_translate(api_base, model, prompt, block, *args):
+            if block == body and timeouts:
+                raise timeouts.pop()
+            return "<p>Translated</p>" if block == body else "<p>Chunk translated</p>"
+        mock_translate.side_effect = fake_translate
+        progress = {}
+
+        translate_with_chunking("http://localhost:11434", "test-model", "prompt", body, progress)
+        assert 'full_fail_size' not in progress
+
+        # The next full request goes through, and clears the earlier failure
+        mock_translate.reset_mock()
+        result, _ = translate_with_chunking("http://localhost:11434", "test-model", "prompt", body, progress)
+        assert mock_translate.call_args_list[0].args[3] == body
+        assert "<p>Translated</p>" in result
+        assert progress.get('full_fail_first') == {}
+
+    def test_full_failure_records_from_several_threads(self):
+        """Test that chapters recording full successes and failures concurrently share progress safely."""
+        import sys
+        from concurrent.futures import ThreadPoolExecutor
+        from libs.translation import _record_full_failure, _record_full_success
+        progress = {}
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            def record(i):
+                for _ in range(200):
+                    _record_full_failure(progress, "test-model", 1000 + i)
+                    _record_full_success(progress, "test-model", 5000)
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                list(pool.map(record, range(8)))
+        finally:
+            sys.setswitchinterval(switch_interval)
+        
+        # Every thread ends with a success above all its failures
+        assert progress['full_fail_first'] == {}
+        assert all(1000 <= size < 1008 for size in progress.get('full_fail_size', {}).values())
+
+    @patch('libs.translation._translate_once')
+    def test_concurrent_chunks_keep_order(self, mock_translate):
+        """Test that chunks translated concurrently are merged in document order."""
+        def fake_translate(api_base, model, prompt, block, *args):
+            if len(block) > 3000:
+                raise TranslationError("Too large")
+            # Later paragraphs come back first
+            time.sleep(0.01 * (10 - int(block.split()[1])))
+            return block.replace("Paragraph", "Paragraphe")
+        mock_translate.side_effect = fake_translate
+        
+        html = "".join(f"<p>Paragraph {i} " + "text " * 100 + "</p>" for i in range(10))
+        result, _ = translate_with_chunking("http://localhost:11434", "test-model", "prompt", html, {},
+                                            concurrency=4)
+        
+        positions = [result.index(f"Paragraphe {i} ") for i in range(10)]
+        assert positions == sorted(positions)
+
+    @patch('libs.translation._translate_once')
+    def test_parallel_models_first_valid_answer_wins(self, mock_translate):
+        """Test that racing models returns the first valid translation, and chunks only if all fail."""
+        def fake_translate(api_base, model, prompt, block, *args):
+            if model == "slow-model":
+                time.sleep(0.05)
+                return "<p>Slow translation</p>"
+            raise TranslationError("Invalid")
+        mock_translate.side_effect = fake_translate
+        
+        result, model_used = translate_with_chunking("http://localhost:11434", ["bad-model", "slow-model"],
+                                                     "prompt", "<p>Original content</p>", {}, parallel_models=2)
+        assert model_used == "slow-model"
+        assert "Slow translation" in result
+        assert mock_translate.call_count == 2
+
+        # All raced models failed: no second full request, straight to chunking
+        mock_translate.reset_mock()
+        def chunks_only(api_base, model, prompt, block, *args):
+            if len(block) > 3000:
+                raise TranslationError("Too large")
+            return "<p>Chunk translated</p>"
+        mock_translate.side_effect = chunks_only
+        html = "".join(f"<p>Paragraph {i} " + "text " * 100 + "</p>" for i in range(10))
+        _, model_used = translate_with_chunking("http://localhost:11434", ["bad-model", "other-model"],
+                                                "prompt", html, {}, parallel_models=2)
+        assert model_used == "bad-model"
+        full_requests = [c for c in mock_translate.call_args_list if len(c.args[3]) > 3000]
+        assert len(full_requests) == 2
+
+    def test_race_losers_are_aborted(self):
+        """Test that the race stops the requests of the losing models instead of leaving them running."""
+        import json
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from libs.translation import _race_models
+        disconnected = threading.Event()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                if payload['model'] == 'slow-model':
+                    # A long generation: wait until the client goes away
+                    self.connection.settimeout(10)
+                    if self.rfile.read(1) == b'':
+                        disconnected.set()
+                    return
+                body = json.dumps({'message': {'content': '<p>Translated content</p>'}}).encode()
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            api_base = f"http://127.0.0.1:{server.server_port}"
+            start = time.time()
+            result = _race_models(api_base, ['slow-model', 'fast-model'], "prompt", "<p>Original content</p>")
+            assert result == ("<p>Translated content</p>", "fast-model")
+            assert time.time() - start < 5
+            assert disconnected.wait(5)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_abort_stops_request_still_connecting(self):
+        """Test that a request which finishes connecting after abort() does not go on waiting."""
+        import threading
+        import urllib3
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from libs.translation import _AbortableSession
+        received = threading.Event()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                # Would hold the request for the whole client timeout
+                received.set()
+                self.connection.settimeout(10)
+                self.rfile.read(1)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        connecting = threading.Event()
+        release = threading.Event()
+        real_connect = urllib3.connection.HTTPConnection.connect
+
+        def slow_connect(conn):
+            connecting.set()
+            release.wait(5)
+            real_connect(conn)
+
+        session = _AbortableSession()
+        errors = []
+
+        def post():
+            try:
+                session.post(f"http://127.0.0.1:{server.server_port}/api/chat", data=b"{}", timeout=10)
+            except Exception as e:
+                errors.append(e)
+        try:
+            with patch.object(urllib3.connection.HTTPConnection, 'connect', slow_connect):
+                thread = threading.Thread(target=post)
+                start = time.time()
+                thread.start()
+                assert connecting.wait(5)
+                session.abort()
+                release.set()
+                thread.join(5)
+            assert not thread.is_alive()
+            assert time.time() - start < 3
+            assert errors
+            assert not received.is_set()
+        finally:
+            release.set()
+            session.close()
+            server.shutdown()
+            server.server_close()
+
+    @patch('libs.translation._translate_once')
+    def test_body_scanned_once_across_halvings(self, mock_translate):
+        """Test that halving the chunk size repacks the same top-level blocks instead of rescanning."""
+        from libs import translation
+
+        def fake_translate(api_base, model, prompt, block, *args):
+            if len(block) > 3000:
+                raise TranslationError("Too large")
+            return block
+        mock_translate.side_effect = fake_translate
+
+        html = "".join(f"<p>Paragraph {i} " + "text " * 40 + "</p>" for i in range(100))
+        with patch('libs.translation._top_level_blocks', wraps=translation._top_level_blocks) as scan:
+            result, _ = translate_with_chunking("http://localhost:11434", "test-model", "prompt", html, {})
+
+        assert result == html
+        assert scan.call_count == 1
+
+    @patch('libs.translation._translate_once')
+    def test_identical_chunks_translated_once(self, mock_translate):
+        """Test that repeated chunks of one chapter are sent once and mirrored in the result."""
+        def fake_translate(api_base, model, prompt, block, *args):
+            if len(block) > 3000:
+                raise TranslationError("Too large")
+            return block.replace("Boilerplate", "Passe-partout")
+        mock_translate.side_effect = fake_translate
+
+        boilerplate = "<p>Boilerplate " + "text " * 500 + "</p>"
+        result, _ = translate_with_chunking("http://localhost:11434", "test-model", "prompt",
+                                            boilerplate * 4, {})
+
+        chunk_calls = [c for c in mock_translate.call_args_list if len(c.args[3]) <= 3000]
+        assert len(chunk_calls) == 1
+        assert result == boilerplate.replace("Boilerplate", "Passe-partout") * 4
+
     @patch('libs.translation._translate_once')
     def test_chunking_with_existing_progress(self, mock_translate):
         """Test chunking behavior with existing progress information."""